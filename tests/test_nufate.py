@@ -14,3 +14,32 @@ def test_cache():
 
     tt = cascade.transfer_matrix(center(ct), depth=1.5)
     assert tt.shape == (6, 6, 20, 80, 80)
+
+
+def test_attenuation():
+    """Attenuation propagates each flavor's own flux through the transfer matrix"""
+    enu = np.logspace(4, 8, 21)
+    ct = center(np.linspace(-1, 1, 5))
+    nodes = np.exp(center(np.log(enu)))
+
+    cascade = nuFATE.NeutrinoCascade(nodes)
+
+    # a different spectrum for every flavor
+    flux = np.array([nodes ** -(2 + 0.1 * i) for i in range(6)])
+    ratio = cascade.attenuation(flux, ct, depth=1.5)
+    assert ratio.shape == (6, ct.size, nodes.size)
+
+    tt = cascade.transfer_matrix(ct, depth=1.5)
+    # the cascade equation is solved for E^2 * flux
+    e2flux = nodes**2 * flux
+    for flavor in range(6):
+        expected = (
+            np.einsum("tij,i->tj", tt[flavor, flavor], e2flux[flavor]) / e2flux[flavor]
+        )
+        if flavor < 4:
+            # plus the neutrinos from tau decay, relative to the tau flux
+            tau = 4 + flavor % 2
+            expected += (
+                np.einsum("tij,i->tj", tt[tau, flavor], e2flux[tau]) / e2flux[tau]
+            )
+        np.testing.assert_allclose(ratio[flavor], expected, rtol=1e-8)
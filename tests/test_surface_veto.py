@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pytest
+from scipy.optimize import fsolve
+
+from toise import surface_veto, surfaces
+
+
+def _fsolve_margin(base_surface, area):
+    def area_diff(margin):
+        return base_surface.expand(margin).get_cap_area() / 1e6 - area
+
+    return fsolve(area_diff, 0)[0]
+
+
+@pytest.mark.parametrize("area", [10, 75])
+def test_margin_for_area(area):
+    """Closed-form margin agrees with a numerical root for a polygonal footprint"""
+    base = surfaces.get_fiducial_surface("Sunflower", 240)
+    margin = surface_veto.margin_for_area(base, area)
+    assert margin == pytest.approx(_fsolve_margin(base, area), rel=1e-9)
+    assert base.expand(margin).get_cap_area() / 1e6 == pytest.approx(area, rel=1e-9)
+
+
+class CubicSurface(object):
+    """A footprint whose area grows faster than quadratically with the margin"""
+
+    def __init__(self, size=1e3):
+        self.size = size
+
+    def expand(self, margin):
+        return CubicSurface(self.size + margin)
+
+    def get_cap_area(self):
+        return self.size**3 / 1e3
+
+
+def test_margin_for_area_fallback(monkeypatch):
+    """Margin falls back to a root finder if the area is not quadratic"""
+    calls = []
+
+    def counting_fsolve(*args, **kwargs):
+        calls.append(args)
+        return fsolve(*args, **kwargs)
+
+    monkeypatch.setattr(surface_veto, "fsolve", counting_fsolve)
+    base = CubicSurface()
+    margin = surface_veto.margin_for_area(base, 8)
+    assert len(calls) == 1
+    assert margin == pytest.approx(1e3, rel=1e-6)
+
+
+def test_coverage_cache_permissions(tmp_path, monkeypatch):
+    """The coverage cache is written with the permissions allowed by the umask"""
+    monkeypatch.setattr(
+        surface_veto,
+        "get_geometric_coverage_for_area",
+        lambda *args: np.ones(10),
+    )
+    cache_file = str(tmp_path / "geometric_veto_coverage.pickle")
+    monkeypatch.setattr(surface_veto.GeometricVetoCoverage, "cache_file", cache_file)
+    surface_veto._load_coverage_cache.cache_clear()
+    try:
+        surface_veto.GeometricVetoCoverage()()
+    finally:
+        surface_veto._load_coverage_cache.cache_clear()
+
+    umask = os.umask(0)
+    os.umask(umask)
+    assert os.stat(cache_file).st_mode & 0o777 == 0o666 & ~umask
+    assert os.listdir(tmp_path) == ["geometric_veto_coverage.pickle"]
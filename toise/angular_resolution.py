@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 
 import numpy as np
 from scipy import interpolate, stats
@@ -28,15 +29,42 @@ def get_angular_resolution(
     return PointSpreadFunction(fname, scale)
 
 
+@lru_cache(maxsize=32)
+def _load_spline_table(fname):
+    """
+    Load a photospline table once per process. Tables are only ever evaluated,
+    so the same instance can be shared by all PSFs built from the same file.
+    """
+    from photospline import SplineTable
+
+    return SplineTable(fname)
+
+
+@lru_cache(maxsize=32)
+def _read_pickle(fname):
+    import pandas as pd
+
+    return pd.read_pickle(fname)
+
+
+@lru_cache(maxsize=32)
+def _load_npz(fname):
+    with np.load(fname) as f:
+        arrays = {k: f[k] for k in f.files}
+    for v in arrays.values():
+        v.setflags(write=False)
+    return arrays
+
+
 class AngularResolution(object):
     def __init__(
         self, fname=os.path.join(data_dir, "veto", "aachen_angular_resolution.npz")
     ):
-        f = np.load(fname)
+        f = _load_npz(fname)
         xd = f["log10_energy"]
         yd = f["cos_theta"]
         x, y = np.meshgrid(xd, yd)
-        zd = f["median_opening_angle"]
+        zd = f["median_opening_angle"].copy()
         # extrapolate with a constant
         zd[-8:, :] = zd[-9, :]
 
@@ -61,9 +89,8 @@ class PointSpreadFunction(object):
         """
         if not fname.startswith("/"):
             fname = os.path.join(data_dir, "psf", fname)
-        from photospline import SplineTable
 
-        self._spline = SplineTable(fname)
+        self._spline = _load_spline_table(fname)
         self._loge_extents, self._ct_extents = self._spline.extents[:2]
         if self._ct_extents == (-1, 0):
             self._mirror = True
@@ -72,16 +99,18 @@ class PointSpreadFunction(object):
         self._scale = scale
 
     def __call__(self, psi, energy, cos_theta):
-        psi, loge, ct = np.broadcast_arrays(
-            np.degrees(psi) / self._scale, np.log10(energy), cos_theta
-        )
-        loge = np.clip(loge, *self._loge_extents)
+        # clamp energy and zenith to the table before broadcasting against psi
+        loge = np.clip(np.log10(energy), *self._loge_extents)
+        ct = cos_theta
         if self._mirror:
             ct = -np.abs(ct)
         ct = np.clip(ct, *self._ct_extents)
+        psi, loge, ct = np.broadcast_arrays(
+            np.multiply(psi, np.degrees(1.0) / self._scale), loge, ct
+        )
 
         evaluates = self._spline.evaluate_simple([loge, ct, psi])
-        return np.where(np.isfinite(evaluates), evaluates, 1.0)
+        return np.nan_to_num(evaluates, copy=False, nan=1.0, posinf=1.0, neginf=1.0)
 
 
 class _king_gen(stats.rv_continuous):
@@ -115,6 +144,39 @@ class _king_gen(stats.rv_continuous):
 king = _king_gen(name="king", a=0.0)
 
 
+def _king_cdf(x, sigma, gamma):
+    """
+    Equivalent to king.cdf(x, sigma, gamma), but evaluates the closed-form
+    CDF directly rather than going through the argument handling in
+    rv_continuous
+    """
+    x, sigma, gamma = np.broadcast_arrays(x, sigma, gamma)
+    if not king._argcheck(sigma, gamma):
+        return np.full(x.shape, np.nan)[()]
+    cdf = np.asarray(king._cdf(x, sigma, gamma), dtype=float)
+    # clamp to the support [0, 180]
+    cdf[x <= 0] = 0
+    cdf[x >= 180] = 1
+    return cdf[()]
+
+
+def _king_ppf(p, sigma, gamma):
+    """
+    Equivalent to king.ppf(p, sigma, gamma), but inverts the closed-form CDF
+    1 - (1 + x**2/(2*gamma*sigma**2))**(1-gamma) directly rather than
+    root-finding element by element
+    """
+    p, sigma, gamma = np.broadcast_arrays(p, sigma, gamma)
+    if not king._argcheck(sigma, gamma):
+        return np.full(p.shape, np.nan)[()]
+    # p outside [0, 1] yields nan, p == 1 yields inf
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x2 = np.expm1(np.log1p(-p) / (1 - gamma))
+        x = sigma * np.sqrt(2 * gamma * x2)
+    # clamp to the support [0, 180]
+    return np.minimum(x, 180)[()]
+
+
 class _fm_gen(stats.rv_continuous):
     """
     Fisher-von Mises distribution of cos(alpha), the equivalent of a normal
@@ -136,24 +198,28 @@ class KingPointSpreadFunctionBase(object):
         self._scale = scale
 
     def get_quantile(self, p, energy, cos_theta):
-        p, loge, ct = np.broadcast_arrays(p, np.log10(energy), cos_theta)
+        # the parameters depend only on energy and zenith, so evaluate them
+        # before broadcasting against p
+        loge, ct = np.broadcast_arrays(np.log10(energy), cos_theta)
         if hasattr(self._scale, "__call__"):
             scale = self._scale(10**loge)
         else:
             scale = self._scale
         sigma, gamma = self.get_params(loge, ct)
-        return np.radians(king.ppf(p, sigma, gamma)) / scale
+        # convert to radians and scale in a single pass
+        return _king_ppf(p, sigma, gamma) * (np.radians(1.0) / scale)
 
     def __call__(self, psi, energy, cos_theta):
-        psi, loge, ct = np.broadcast_arrays(
-            np.degrees(psi), np.log10(energy), cos_theta
-        )
+        # the parameters depend only on energy and zenith, so evaluate them
+        # before broadcasting against psi
+        loge, ct = np.broadcast_arrays(np.log10(energy), cos_theta)
         if hasattr(self._scale, "__call__"):
             scale = self._scale(10**loge)
         else:
             scale = self._scale
         sigma, gamma = self.get_params(loge, ct)
-        return king.cdf(psi / scale, sigma, gamma)
+        # convert to degrees and scale in a single pass
+        return _king_cdf(np.multiply(psi, np.degrees(1.0) / scale), sigma, gamma)
 
 
 class KingPointSpreadFunction(KingPointSpreadFunctionBase):
@@ -161,30 +227,20 @@ class KingPointSpreadFunction(KingPointSpreadFunctionBase):
         self, fname="Sunflower_240_kingpsf4", psf_class=(0, 4), scale=1.0, **kwargs
     ):
         super(KingPointSpreadFunction, self).__init__(**kwargs)
-        import operator
-
-        import pandas as pd
-        from scipy import interpolate
 
         if not fname.startswith("/"):
             fname = os.path.join(data_dir, "psf", fname)
-        params = pd.read_pickle(fname + ".pickle")
-        bins = pd.read_pickle(fname + ".bins.pickle")
-        params = pd.DataFrame(
-            {k: params.apply(operator.itemgetter(k)) for k in ("sigma", "gamma")}
-        )
-        # remove energy underflow bin
-        for k in params.index.levels[0]:
-            del params.sigma[k, 0]
-            del params.gamma[k, 0]
+        params = _read_pickle(fname + ".pickle")
+        bins = _read_pickle(fname + ".bins.pickle")
         x, y = list(map(center, bins))
-        key = str(psf_class[0])
-        self._sigma = interpolate.RectBivariateSpline(
-            x, y, abs(params.sigma[key]).values.reshape(9, 10), s=5e-1
-        )
-        self._gamma = interpolate.RectBivariateSpline(
-            x, y, params.gamma[key].values.reshape(9, 10), s=1e1
+        # select the requested resolution class, and remove energy underflow bin
+        resolution, ebin = (params.index.get_level_values(i) for i in range(2))
+        params = params.values[(resolution == str(psf_class[0])) & (ebin != 0)]
+        sigma, gamma = (
+            np.array([p[k] for p in params]).reshape(9, 10) for k in ("sigma", "gamma")
         )
+        self._sigma = interpolate.RectBivariateSpline(x, y, abs(sigma), s=5e-1)
+        self._gamma = interpolate.RectBivariateSpline(x, y, gamma, s=1e1)
         self._scale = scale
 
     def get_params(self, log_energy, cos_theta):
@@ -199,14 +255,13 @@ class KingPointSpreadFunction(KingPointSpreadFunctionBase):
 class SplineKingPointSpreadFunction(KingPointSpreadFunctionBase):
     def __init__(self, fname="Sunflower_240_kingpsf1", **kwargs):
         super(SplineKingPointSpreadFunction, self).__init__(**kwargs)
-        from photospline import SplineTable
 
         if not fname.startswith("/"):
             fname = os.path.join(data_dir, "psf", fname)
 
         self._splines = dict(
-            sigma=SplineTable(fname + ".sigma.fits"),
-            gamma=SplineTable(fname + ".gamma.fits"),
+            sigma=_load_spline_table(fname + ".sigma.fits"),
+            gamma=_load_spline_table(fname + ".gamma.fits"),
         )
 
     def get_params(self, log_energy, cos_theta):
@@ -214,10 +269,11 @@ class SplineKingPointSpreadFunction(KingPointSpreadFunctionBase):
         Interpolate for sigma and gamma
         """
 
-        sigma = 10 ** self._splines["sigma"].evaluate_simple([log_energy, cos_theta])
-        gamma = (
-            10 ** self._splines["gamma"].evaluate_simple([log_energy, cos_theta]) + 1
-        )
+        coords = [log_energy, cos_theta]
+        sigma = 10 ** self._splines["sigma"].evaluate_simple(coords)
+        gamma = 10 ** self._splines["gamma"].evaluate_simple(coords)
+        # in place for arrays
+        gamma += 1
 
         return sigma, gamma
 
@@ -234,19 +290,18 @@ class FictiveKingPointSpreadFunction(KingPointSpreadFunctionBase):
         """
         Interpolate for sigma and gamma
         """
-        with np.errstate(invalid="ignore"):
-            angular_resolution_scale = np.where(
-                log_energy < 6, 0.05 * (6 - log_energy) ** 2.5, 0
-            )
+        # worse resolution below 1e6 (NB: fmax also maps nan to 0)
+        angular_resolution_scale = np.fmax(6 - log_energy, 0)
+        angular_resolution_scale **= 2.5
+        angular_resolution_scale *= 0.05
         # dip at the horizon, improvement with energy up to 1e6
-        sigma = 10 ** (
-            np.where(
-                np.abs(cos_theta) < 0.15,
-                (cos_theta * 3) ** 2 - 1.2,
-                (cos_theta / 1.05) ** 2 - 1.0,
-            )
-            + angular_resolution_scale
+        sigma = np.where(
+            np.abs(cos_theta) < 0.15,
+            (cos_theta * 3) ** 2 - 1.2,
+            (cos_theta / 1.05) ** 2 - 1.0,
         )
+        sigma += angular_resolution_scale
+        np.power(10, sigma, out=sigma)
         # tails contract at the horizon, and with energy up to 1e6
         gamma = 10 ** ((-0.5 - (cos_theta / 3) ** 2) + angular_resolution_scale / 2) + 1
         return sigma, gamma
@@ -262,8 +317,14 @@ class FictiveCascadePointSpreadFunction(object):
 
     def __call__(self, psi, energy, cos_theta):
 
-        psi, energy, cos_theta = np.broadcast_arrays(psi, energy, cos_theta)
+        shape = np.broadcast(psi, energy, cos_theta).shape
+        # sigma depends only on energy; evaluate it before broadcasting
         sigma = self._a / np.sqrt(energy) + self._b
 
-        evaluates = 1 - np.exp(-(psi**2) / (2 * sigma**2))
-        return np.where(np.isfinite(evaluates), evaluates, 1.0)
+        # evaluate 1 - exp(-psi^2/(2 sigma^2)) in a single output buffer
+        evaluates = np.empty(shape)
+        np.divide(-(np.asarray(psi) ** 2), 2 * sigma**2, out=evaluates)
+        np.exp(evaluates, out=evaluates)
+        np.subtract(1, evaluates, out=evaluates)
+        evaluates[~np.isfinite(evaluates)] = 1.0
+        return evaluates
@@ -1,7 +1,9 @@
 import copy
 import itertools
 import os
+import re
 import warnings
+from functools import lru_cache
 
 import dashi
 import healpy
@@ -16,10 +18,15 @@ from .surfaces import get_fiducial_surface
 from .util import center, data_dir, defer
 
 
-def load_jvs_mese():
+@lru_cache(maxsize=1)
+def load_jvs_mese(directory="mese"):
     """
     Load the effective areas used in the MESE diffuse analysis (10.1103/PhysRevD.91.022001)
 
+    :param directory: directory containing the per-bin effective area tables.
+        Relative paths are taken relative to the effective area data
+        directory.
+
     :returns: a tuple (edges, aeff). the 6 dimensions of aeff are: nu type (6),
               nu energy, cos(nu zenith), reco energy, cos(reco zenith),
               signature (cascade/track). edges is a list of length 4 with the
@@ -28,7 +35,12 @@ def load_jvs_mese():
     shape = None
     edges = None
     aeff = None
-    base = "/Users/jakob/Documents/IceCube/reports/charm_search/supplemental/effective_area.per_bin.nu_{flavor}{anti}.{interaction}.{channel}.txt.gz"
+    if not directory.startswith("/"):
+        directory = os.path.join(data_dir, "aeff", directory)
+    base = os.path.join(
+        directory,
+        "effective_area.per_bin.nu_{flavor}{anti}.{interaction}.{channel}.txt.gz",
+    )
     for i, (flavor, anti) in enumerate(
         itertools.product(("e", "mu", "tau"), ("", "_bar"))
     ):
@@ -36,8 +48,10 @@ def load_jvs_mese():
             for interaction in "cc", "nc", "gr":
                 try:
                     data = np.loadtxt(base.format(**locals()))
-                except:
-                    pass
+                except IOError:
+                    # not every channel exists for every flavor (e.g. the
+                    # Glashow resonance)
+                    continue
                 if shape is None:
                     edges = []
                     for k in range(4):
@@ -48,6 +62,11 @@ def load_jvs_mese():
                     aeff = np.zeros([6] + list(reversed(shape)) + [2])
                 aeff[i, ..., j] += data[:, -2].reshape(shape).T
 
+    # raise rather than return, so that lru_cache doesn't remember the miss
+    if aeff is None:
+        raise IOError("no MESE effective area tables found in " + directory)
+    for v in edges + [aeff]:
+        v.setflags(write=False)
     return edges, aeff
 
 
@@ -89,11 +108,13 @@ class MuonSelectionEfficiency(object):
             self.energy_threshold = energy_threshold
 
     def __call__(self, muon_energy, cos_theta):
-        return np.where(
-            muon_energy >= self.energy_threshold,
-            np.clip(self.interp(np.log10(muon_energy)), 0, 1),
-            0.0,
-        )
+        muon_energy = np.asarray(muon_energy)
+        # only evaluate the interpolant above threshold
+        mask = muon_energy >= self.energy_threshold
+        efficiency = np.zeros(muon_energy.shape)
+        values = self.interp(np.log10(muon_energy[mask]))
+        efficiency[mask] = np.clip(values, 0, 1, out=values)
+        return efficiency
 
 
 class ZenithDependentMuonSelectionEfficiency(object):
@@ -116,21 +137,20 @@ class ZenithDependentMuonSelectionEfficiency(object):
         return self._spline.eval([loge, cos_theta])
 
     def __call__(self, muon_energy, cos_theta):
-        loge, cos_theta = np.broadcast_arrays(np.log10(muon_energy), cos_theta)
+        muon_energy, cos_theta = np.broadcast_arrays(muon_energy, cos_theta)
+        # only evaluate the spline above threshold
+        mask = muon_energy >= self.energy_threshold
+        muon_energy, cos_theta = muon_energy[mask], cos_theta[mask]
         if hasattr(self._scale, "__call__"):
-            scale = self._scale(10**loge)
+            scale = self._scale(muon_energy)
         else:
             scale = self._scale
-        return np.where(
-            muon_energy >= self.energy_threshold,
-            np.clip(
-                scale
-                * self._spline.evaluate_simple([np.log10(muon_energy), cos_theta]),
-                0,
-                1,
-            ),
-            0.0,
+        efficiency = np.zeros(mask.shape)
+        values = scale * self._spline.evaluate_simple(
+            [np.log10(muon_energy), cos_theta]
         )
+        efficiency[mask] = np.clip(values, 0, 1, out=values)
+        return efficiency
 
 
 class FictiveMuonSelectionEfficiency:
@@ -228,21 +248,20 @@ class StepFunction(VetoThreshold):
         self.threshold = threshold
 
     def accept(self, e_mu, cos_theta=1.0):
-
-        return np.where(
-            cos_theta > 0.05,
-            (e_mu > self.threshold) & (cos_theta >= self.max_inclination),
-            True,
+        # NB: ~(a > b) rather than (a <= b) so that NaN zeniths are accepted.
+        #     asarray() makes ~ a logical negation for Python scalars too.
+        return ~(np.asarray(cos_theta) > 0.05) | (
+            (e_mu > self.threshold) & (cos_theta >= self.max_inclination)
         )
 
     def veto(self, e_mu, cos_theta=1.0):
         """
         Return True if an atmospheric event would be rejected by the veto
         """
-        return np.where(
-            cos_theta > 0.05,
-            (e_mu > self.threshold) & (cos_theta >= self.max_inclination),
-            False,
+        return (
+            (cos_theta > 0.05)
+            & (e_mu > self.threshold)
+            & (cos_theta >= self.max_inclination)
         )
 
 
@@ -262,6 +281,79 @@ class MuonEffectiveArea(object):
         return geo * self._efficiency(muon_energy, cos_theta)
 
 
+def _nearest_index(centers, x):
+    """
+    Find the indices of the grid points in *centers* closest to *x*
+
+    This is equivalent to nearest-neighbor interpolation with
+    RegularGridInterpolator (ties go to the lower grid point), but without
+    the overhead of constructing and evaluating a generic N-d interpolant.
+
+    :param centers: ascending grid points
+    :param x: points to look up. These must lie within the range of *centers*.
+    """
+    centers = np.asarray(centers)
+    x = np.asarray(x)
+    if not ((x >= centers[0]) & (x <= centers[-1])).all():
+        raise ValueError("Query points are out of bounds")
+    i = np.clip(np.searchsorted(centers, x) - 1, 0, centers.size - 2)
+    return np.where((x - centers[i]) / (centers[i + 1] - centers[i]) <= 0.5, i, i + 1)
+
+
+def _load_histogram(hdf, where):
+    """
+    Read the bin edges and contents of a histogram stored with
+    :py:func:`dashi.histsave`, skipping the squared weights that
+    :py:func:`dashi.histload` would also read.
+
+    :returns: a tuple binedges, bincontent, with under- and overflow bins
+        stripped as in :py:attr:`dashi.histogram.histogram.bincontent`
+    """
+    bincontent = hdf.get_node(where, "_h_bincontent").read()
+    binedges = [
+        hdf.get_node(where, "_h_binedges_%d" % i).read()[1:-1]
+        for i in range(bincontent.ndim)
+    ]
+    return binedges, bincontent[(slice(1, -1),) * bincontent.ndim]
+
+
+@lru_cache()
+def _load_production_efficiency(fname, flavors):
+    """
+    Load a production efficiency table for the given flavors
+
+    :returns: a tuple (binedges, centers, log_efficiency). *centers* are the
+        bin centers in log10 of energy (and cos_theta), and *log_efficiency*
+        stacks log10 of the efficiency for each of *flavors* and its
+        antiparticle along a new leading axis.
+    """
+    # the tables are only a few MB, so pull the whole file into memory with a
+    # single read rather than seeking through it once per flavor
+    with tables.open_file(
+        os.path.join(data_dir, "cross_sections", fname), driver="H5FD_CORE"
+    ) as hdf:
+        hists = [
+            _load_histogram(hdf, "/nu" + family + anti)
+            for family, anti in itertools.product(flavors, ("", "_bar"))
+        ]
+    # all flavors share the same binning, so the lookup only has to be done once
+    binedges = hists[0][0]
+    for other, _ in hists[1:]:
+        assert all(
+            np.array_equal(a, b) for a, b in zip(binedges, other)
+        ), "flavors must be binned identically"
+    edges = [np.log10(binedges[0]), binedges[1]] + list(map(np.log10, binedges[2:]))
+    centers = list(map(center, edges))
+    bincontent = np.array([content for _, content in hists])
+    with np.errstate(divide="ignore"):
+        y = np.where(~(bincontent <= 0), np.log10(bincontent), -np.inf)
+    assert not np.isnan(y).any()
+
+    for v in binedges + centers + [y]:
+        v.setflags(write=False)
+    return tuple(binedges), tuple(centers), y
+
+
 def _interpolate_production_efficiency(
     cos_zenith, fname="muon_efficiency.hdf5", flavors=["mu"]
 ):
@@ -273,50 +365,27 @@ def _interpolate_production_efficiency(
         edges in E_nu, cos_theta, and E_mu, while *efficiency* is a 3D array
         with the same axes.
     """
-    from scipy import interpolate
-
-    efficiencies = []
-    with tables.open_file(os.path.join(data_dir, "cross_sections", fname)) as hdf:
-        for family, anti in itertools.product(flavors, ("", "_bar")):
-            h = dashi.histload(hdf, "/nu" + family + anti)
-            edges = [np.log10(h.binedges[0]), h.binedges[1]] + list(
-                map(np.log10, h.binedges[2:])
-            )
-            centers = list(map(center, edges))
-            newcenters = [
-                centers[0],
-                np.clip(cos_zenith, centers[1].min(), centers[1].max()),
-            ] + centers[2:]
-            with np.errstate(divide="ignore"):
-                y = np.where(~(h.bincontent <= 0), np.log10(h.bincontent), -np.inf)
-
-            assert not np.isnan(y).any()
-            interpolant = interpolate.RegularGridInterpolator(
-                centers, y, bounds_error=True, fill_value=-np.inf
-            )
-
-            xi = np.vstack(
-                [x.flatten() for x in np.meshgrid(*newcenters, indexing="ij")]
-            ).T
-            assert np.isfinite(xi).all()
-
-            # NB: we use nearest-neighbor interpolation here because
-            # n-dimensional linear interpolation has the unfortunate side-effect
-            # of dropping the highest-energy muon energy bin in each neutrino
-            # energy bin, in turn because the next-highest-energy bin is zero
-            # (-inf in log space). Ignoring that bin significantly
-            # underestimates the muon flux from steeply falling neutrino spectra.
-            v = interpolant(xi, "nearest").reshape([x.size for x in newcenters])
+    binedges, centers, y = _load_production_efficiency(fname, tuple(flavors))
+    newcenters = [
+        centers[0],
+        np.clip(cos_zenith, centers[1].min(), centers[1].max()),
+    ] + list(centers[2:])
+    assert all(np.isfinite(x).all() for x in newcenters)
 
-            v[~np.isfinite(v)] = -np.inf
+    # NB: we use nearest-neighbor interpolation here because
+    # n-dimensional linear interpolation has the unfortunate side-effect
+    # of dropping the highest-energy muon energy bin in each neutrino
+    # energy bin, in turn because the next-highest-energy bin is zero
+    # (-inf in log space). Ignoring that bin significantly
+    # underestimates the muon flux from steeply falling neutrino spectra.
+    idx = np.ix_(*(_nearest_index(c, x) for c, x in zip(centers, newcenters)))
+    v = y[(slice(None),) + idx]
 
-            assert not np.isnan(v).any()
+    v[~np.isfinite(v)] = -np.inf
 
-            efficiencies.append(10**v)
+    assert not np.isnan(v).any()
 
-    return (h.binedges[0], None,) + tuple(
-        h.binedges[2:]
-    ), np.array(efficiencies)
+    return (binedges[0], None) + tuple(binedges[2:]), 10**v
 
 
 def _ring_range(nside):
@@ -328,7 +397,31 @@ def _ring_range(nside):
     # cos(zenith). This assumes that the underlying map is in equatorial
     # coordinates.
     centers = -healpy.ringinfo(nside, np.arange(1, 4 * nside))[2]
-    return np.concatenate(([-1], 0.5 * (centers[1:] + centers[:-1]), [1]))
+    edges = np.empty(centers.size + 1)
+    edges[0], edges[-1] = -1, 1
+    np.add(centers[1:], centers[:-1], out=edges[1:-1])
+    edges[1:-1] *= 0.5
+    return edges
+
+
+@lru_cache(maxsize=16)
+def _default_ct_edges(nside):
+    ct_edges = np.linspace(-1, 1, 11) if nside is None else _ring_range(nside)
+    ct_edges.setflags(write=False)
+    return ct_edges
+
+
+def _normalize_ct_edges(ct_edges):
+    """
+    Interpret a cos_theta binning argument
+
+    :param ct_edges: edges of *cos_theta* bins. If an integer, interpret as
+        the NSide of a HEALpix map. If None, use 10 equal-width bins.
+    :returns: the (possibly shared, read-only) bin edges
+    """
+    if ct_edges is None or isinstance(ct_edges, int):
+        return _default_ct_edges(ct_edges)
+    return ct_edges
 
 
 def get_muon_production_efficiency(ct_edges=None):
@@ -343,11 +436,7 @@ def get_muon_production_efficiency(ct_edges=None):
         edges in E_nu, cos_theta, and E_mu, while *efficiency* is a 3D array
         with the same axes.
     """
-    if ct_edges is None:
-        ct_edges = np.linspace(-1, 1, 11)
-    elif isinstance(ct_edges, int):
-        nside = ct_edges
-        ct_edges = _ring_range(nside)
+    ct_edges = _normalize_ct_edges(ct_edges)
 
     edges, efficiency = _interpolate_production_efficiency(center(ct_edges))
     return (edges[0], ct_edges, edges[2]), efficiency
@@ -365,11 +454,7 @@ def get_starting_event_efficiency(ct_edges=None):
         edges in E_nu, cos_theta, and E_mu, while *efficiency* is a 3D array
         with the same axes.
     """
-    if ct_edges is None:
-        ct_edges = np.linspace(-1, 1, 11)
-    elif isinstance(ct_edges, int):
-        nside = ct_edges
-        ct_edges = _ring_range(nside)
+    ct_edges = _normalize_ct_edges(ct_edges)
 
     edges, efficiency = _interpolate_production_efficiency(
         center(ct_edges), "starting_event_efficiency.hdf5", ["e", "mu", "tau"]
@@ -389,11 +474,7 @@ def get_cascade_production_density(ct_edges=None):
         edges in E_nu, cos_theta, and E_mu, while *efficiency* is a 3D array
         with the same axes.
     """
-    if ct_edges is None:
-        ct_edges = np.linspace(-1, 1, 11)
-    elif isinstance(ct_edges, int):
-        nside = ct_edges
-        ct_edges = _ring_range(nside)
+    ct_edges = _normalize_ct_edges(ct_edges)
 
     edges, efficiency = _interpolate_production_efficiency(
         center(ct_edges), "cascade_efficiency.hdf5", ["e", "mu", "tau"]
@@ -422,11 +503,7 @@ def get_doublebang_production_density(ct_edges=None):
         edges in E_nu, cos_theta, and E_mu, while *efficiency* is a 3D array
         with the same axes.
     """
-    if ct_edges is None:
-        ct_edges = np.linspace(-1, 1, 11)
-    elif isinstance(ct_edges, int):
-        nside = ct_edges
-        ct_edges = _ring_range(nside)
+    ct_edges = _normalize_ct_edges(ct_edges)
 
     edges, efficiency = _interpolate_production_efficiency(
         center(ct_edges), "doublebang_efficiency.hdf5", ["e", "mu", "tau"]
@@ -471,7 +548,7 @@ class effective_area(object):
 
     def compatible_with(self, other):
         return self.values.shape == other.values.shape and all(
-            ((a == b).all() for a, b in zip(self.bin_edges, other.bin_edges))
+            np.array_equal(a, b) for a, b in zip(self.bin_edges, other.bin_edges)
         )
 
     def restrict_energy_range(self, emin, emax):
@@ -523,7 +600,18 @@ class effective_area(object):
     @property
     def ring_repeat_pattern(self):
         assert self.is_healpix
-        return healpy.ringinfo(self.nside, np.arange(self.nring) + 1)[1]
+        return _ring_repeat_pattern(self.nside, self.nring)
+
+
+@lru_cache(maxsize=16)
+def _ring_repeat_pattern(nside, nring):
+    """
+    Return the number of pixels in each of the first *nring* rings of a
+    HEALpix map with NSide *nside*.
+    """
+    pattern = healpy.ringinfo(nside, np.arange(nring) + 1)[1]
+    pattern.setflags(write=False)
+    return pattern
 
 
 def eval_psf(point_spread_function, mu_energy, ct, psi_bins):
@@ -538,6 +626,7 @@ def create_bundle_aeff(
     selection_efficiency=defer(MuonSelectionEfficiency),
     surface=defer(get_fiducial_surface, "IceCube"),
     cos_theta=None,
+    dtype=np.float64,
     **kwargs,
 ):
     """
@@ -563,6 +652,9 @@ def create_bundle_aeff(
         bin in a HEALpix map with this NSide, otherwise bin in cosine of
         zenith angle. If None, use the native binning of the muon production
         efficiency histogram.
+    :param dtype: floating-point type of the effective area table. Use
+        np.float32 to halve its memory footprint and bandwidth at the cost of
+        precision.
 
     :returns: a tuple of effective_area objects
     """
@@ -577,15 +669,16 @@ def create_bundle_aeff(
 
     # Step 1: Get binning
     (e_nu, cos_theta, e_mu), efficiency = get_muon_production_efficiency(cos_theta)
+    ct_center = center(cos_theta)
 
     # Step 2: Geometric muon effective area (no selection effects yet)
     # NB: assumes cylindrical symmetry.
-    aeff = np.vectorize(surface.average_area)(cos_theta[:-1], cos_theta[1:])[None, :]
+    aeff = surface.average_area(cos_theta[:-1], cos_theta[1:])[None, :]
 
     # Step 3: apply selection efficiency
     # selection_efficiency = selection_efficiency(*np.meshgrid(center(e_mu), center(cos_theta), indexing='ij')).T
     selection_efficiency = selection_efficiency(
-        *np.meshgrid(e_mu[1:], center(cos_theta), indexing="ij")
+        *np.meshgrid(e_mu[1:], ct_center, indexing="ij")
     )
     aeff = aeff * selection_efficiency
 
@@ -596,17 +689,17 @@ def create_bundle_aeff(
         2,
         aeff[..., None] * np.eye(response.shape[0])[:, None, :],
         response,
-    )
+    ).astype(dtype, copy=False)
 
     # Step 5.1: split the geometric area in the southern hemisphere into a
     #           portion shadowed by the surface veto (if it exists) and one that
     #           is not
-    shadowed_fraction = veto_coverage(cos_theta)[None, :]
+    shadowed_fraction = np.asarray(veto_coverage(cos_theta), dtype=dtype)[None, :]
 
     # Step 5.2: apply suppression from surface veto
     veto_suppression = 1 - veto_efficiency.accept(
-        *np.meshgrid(center(e_mu), center(cos_theta), indexing="ij")
-    )
+        *np.meshgrid(center(e_mu), ct_center, indexing="ij")
+    ).astype(dtype, copy=False)
 
     # combine into an energy- and zenith-dependent acceptance for muon bundles
     weights = [shadowed_fraction * veto_suppression, 1 - shadowed_fraction]
@@ -632,6 +725,7 @@ def create_throughgoing_aeff(
     psf=defer(get_angular_resolution, "IceCube"),
     psi_bins=np.sqrt(np.linspace(0, np.radians(2) ** 2, 100)),
     cos_theta=None,
+    dtype=np.float64,
 ):
     """
     Create an effective area for neutrino-induced, incoming muons
@@ -660,6 +754,9 @@ def create_throughgoing_aeff(
         zenith angle. If None, use the native binning of the muon production
         efficiency histogram.
     :param psi_bins: edges of bins in muon/reconstruction opening angle (radians)
+    :param dtype: floating-point type of the effective area table. Use
+        np.float32 to halve its memory footprint and bandwidth at the cost of
+        precision.
 
     :returns: an effective_area object
     """
@@ -677,45 +774,52 @@ def create_throughgoing_aeff(
     # Step 1: Efficiency for a neutrino to produce a muon that reaches the
     #         detector with a given energy
     (e_nu, cos_theta, e_mu), efficiency = get_muon_production_efficiency(cos_theta)
+    ct_center = center(cos_theta)
 
     # Step 2: Geometric muon effective area (no selection effects yet)
     # NB: assumes cylindrical symmetry.
-    aeff = efficiency * (
-        np.vectorize(surface.average_area)(cos_theta[:-1], cos_theta[1:])[
-            None, None, :, None
-        ]
-    )
+    area = surface.average_area(cos_theta[:-1], cos_theta[1:])
 
     # Step 3: apply selection efficiency
     # selection_efficiency = selection_efficiency(*np.meshgrid(center(e_mu), center(cos_theta), indexing='ij')).T
     selection_efficiency = selection_efficiency(
-        *np.meshgrid(e_mu[1:], center(cos_theta), indexing="ij")
+        *np.meshgrid(e_mu[1:], ct_center, indexing="ij")
     ).T
 
     # Explicit energy threshold disabled for now; let muon background take over
     # at whatever energy it drowns out the signal
     # selection_efficiency *= energy_threshold.accept(*np.meshgrid(e_mu[1:], center(cos_theta), indexing='ij')).T
-    aeff *= selection_efficiency[None, None, :, :]
+    # NB: fold the (zenith-only) area into the selection efficiency first, so
+    # that the 4D efficiency table is only swept once
+    aeff = efficiency * (area[:, None] * selection_efficiency)[None, None, :, :]
 
     # Step 4: apply smearing for angular resolution
     # Add an overflow bin if none present
     if np.isfinite(psi_bins[-1]):
         psi_bins = np.concatenate((psi_bins, [np.inf]))
-    cdf = eval_psf(psf, center(e_mu), center(cos_theta), psi_bins[:-1])
+    cdf = eval_psf(psf, center(e_mu), ct_center, psi_bins[:-1])
 
-    total_aeff = np.zeros((6,) + aeff.shape[1:] + (psi_bins.size - 1,))
-    # expand differential contributions along the opening-angle axis
-    total_aeff[2:4, ..., :-1] = aeff[..., None] * np.diff(cdf, axis=2)[None, ...]
+    total_aeff = np.zeros((6,) + aeff.shape[1:] + (psi_bins.size - 1,), dtype=dtype)
+    # expand differential contributions along the opening-angle axis, writing
+    # directly into the output to avoid a temporary the size of total_aeff
+    np.multiply(
+        aeff[..., None], np.diff(cdf, axis=2)[None, ...], out=total_aeff[2:4, ..., :-1]
+    )
     # put the remainder in the overflow bin
-    total_aeff[2:4, ..., -1] = aeff * (1 - cdf[..., -1])[None, None, ...]
+    np.multiply(aeff, (1 - cdf[..., -1])[None, None, ...], out=total_aeff[2:4, ..., -1])
 
     # Step 5: apply smearing for energy resolution
-    response = energy_resolution.get_response_matrix(e_mu, e_mu)
-    total_aeff = np.apply_along_axis(np.inner, 3, total_aeff, response)
+    response = energy_resolution.get_response_matrix(e_mu, e_mu).astype(
+        dtype, copy=False
+    )
+    # NB: energy is the next-to-last axis, so this is a (broadcast) matmul
+    total_aeff = response @ total_aeff
 
     # Step 6: split the effective area in into a portion shadowed by the
     #         surface veto (if it exists) and one that is not
-    shadowed_fraction = veto_coverage(cos_theta)[None, None, :, None, None]
+    shadowed_fraction = np.asarray(veto_coverage(cos_theta), dtype=dtype)[
+        None, None, :, None, None
+    ]
     weights = [shadowed_fraction, 1 - shadowed_fraction]
 
     edges = (e_nu, cos_theta, e_mu, psi_bins)
@@ -738,10 +842,15 @@ def create_cascade_aeff(
     psf=defer(get_angular_resolution, "IceCube", channel="cascade"),
     psi_bins=np.sqrt(np.linspace(0, np.radians(20) ** 2, 10)),
     cos_theta=None,
+    dtype=np.float64,
 ):
     """
     Create an effective area for neutrinos interacting inside the volume
 
+    :param dtype: floating-point type of the effective area table. Use
+        np.float32 to halve its memory footprint and bandwidth at the cost of
+        precision.
+
     :returns: an effective_area object
     """
 
@@ -762,6 +871,7 @@ def create_cascade_aeff(
         (e_nu, cos_theta, e_shower), aeff = get_cascade_production_density(cos_theta)
     elif channel == "doublebang":
         (e_nu, cos_theta, e_shower), aeff = get_doublebang_production_density(cos_theta)
+    ct_center = center(cos_theta)
 
     # Step 2: Geometric effective area (no selection effects yet)
     aeff *= surface.volume()
@@ -770,7 +880,7 @@ def create_cascade_aeff(
 
     # Step 3: apply selection efficiency
     selection_efficiency = selection_efficiency(
-        *np.meshgrid(e_shower[1:], center(cos_theta), indexing="ij")
+        *np.meshgrid(e_shower[1:], ct_center, indexing="ij")
     ).T
     aeff *= selection_efficiency[None, None, ...]
 
@@ -778,17 +888,23 @@ def create_cascade_aeff(
     # Add an overflow bin if none present
     if np.isfinite(psi_bins[-1]):
         psi_bins = np.concatenate((psi_bins, [np.inf]))
-    cdf = eval_psf(psf, center(e_shower), center(cos_theta), psi_bins[:-1])
+    cdf = eval_psf(psf, center(e_shower), ct_center, psi_bins[:-1])
 
-    total_aeff = np.empty(aeff.shape + (psi_bins.size - 1,))
-    # expand differential contributions along the opening-angle axis
-    total_aeff[..., :-1] = aeff[..., None] * np.diff(cdf, axis=2)[None, ...]
+    total_aeff = np.empty(aeff.shape + (psi_bins.size - 1,), dtype=dtype)
+    # expand differential contributions along the opening-angle axis, writing
+    # directly into the output to avoid a temporary the size of total_aeff
+    np.multiply(
+        aeff[..., None], np.diff(cdf, axis=2)[None, ...], out=total_aeff[..., :-1]
+    )
     # put the remainder in the overflow bin
-    total_aeff[..., -1] = aeff * (1 - cdf[..., -1])[None, None, ...]
+    np.multiply(aeff, (1 - cdf[..., -1])[None, None, ...], out=total_aeff[..., -1])
 
     # Step 5: apply smearing for energy resolution
-    response = energy_resolution.get_response_matrix(e_shower, e_shower)
-    total_aeff = np.apply_along_axis(np.inner, 3, total_aeff, response)
+    response = energy_resolution.get_response_matrix(e_shower, e_shower).astype(
+        dtype, copy=False
+    )
+    # NB: energy is the next-to-last axis, so this is a (broadcast) matmul
+    total_aeff = response @ total_aeff
 
     edges = (e_nu, cos_theta, e_shower, psi_bins)
 
@@ -808,10 +924,15 @@ def create_starting_aeff(
     psi_bins=np.sqrt(np.linspace(0, np.radians(20) ** 2, 10)),
     neutrino_energy=np.logspace(4, 12, 81),
     cos_theta=np.linspace(-1, 1, 21),
+    dtype=np.float64,
 ):
     """
     Create an effective area for neutrinos interacting inside the volume
 
+    :param dtype: floating-point type of the effective area table. Use
+        np.float32 to halve its memory footprint and bandwidth at the cost of
+        precision.
+
     :returns: an effective_area object
     """
 
@@ -830,6 +951,7 @@ def create_starting_aeff(
     (e_nu, cos_theta, e_shower), aeff = calculate_cascade_production_density(
         cos_theta, neutrino_energy, depth=1.5
     )
+    ct_center = center(cos_theta)
 
     # Step 2: Geometric effective area (no selection effects yet)
     aeff *= surface.volume()
@@ -838,7 +960,7 @@ def create_starting_aeff(
 
     # Step 3: apply overall selection efficiency
     selection_efficiency = selection_efficiency(
-        *np.meshgrid(e_shower[1:], center(cos_theta), indexing="ij")
+        *np.meshgrid(e_shower[1:], ct_center, indexing="ij")
     ).T
     aeff *= selection_efficiency[None, None, ...]
     # Step 3.5: calculate channel selection efficiency, padding the shape for
@@ -852,24 +974,31 @@ def create_starting_aeff(
                     None, None, :, None
                 ]
                 for nutype in range(aeff.shape[0])
-            ]
+            ],
+            dtype=dtype,
         )
 
     # Step 4: apply smearing for angular resolution
     # Add an overflow bin if none present
     if np.isfinite(psi_bins[-1]):
         psi_bins = np.concatenate((psi_bins, [np.inf]))
-    cdf = eval_psf(psf, center(e_shower), center(cos_theta), psi_bins[:-1])
+    cdf = eval_psf(psf, center(e_shower), ct_center, psi_bins[:-1])
 
-    total_aeff = np.empty(aeff.shape + (psi_bins.size - 1,))
-    # expand differential contributions along the opening-angle axis
-    total_aeff[..., :-1] = aeff[..., None] * np.diff(cdf, axis=2)[None, ...]
+    total_aeff = np.empty(aeff.shape + (psi_bins.size - 1,), dtype=dtype)
+    # expand differential contributions along the opening-angle axis, writing
+    # directly into the output to avoid a temporary the size of total_aeff
+    np.multiply(
+        aeff[..., None], np.diff(cdf, axis=2)[None, ...], out=total_aeff[..., :-1]
+    )
     # put the remainder in the overflow bin
-    total_aeff[..., -1] = aeff * (1 - cdf[..., -1])[None, None, ...]
+    np.multiply(aeff, (1 - cdf[..., -1])[None, None, ...], out=total_aeff[..., -1])
 
     # Step 5: apply smearing for energy resolution
-    response = energy_resolution.get_response_matrix(e_shower, e_shower)
-    total_aeff = np.apply_along_axis(np.inner, 3, total_aeff, response)
+    response = energy_resolution.get_response_matrix(e_shower, e_shower).astype(
+        dtype, copy=False
+    )
+    # NB: energy is the next-to-last axis, so this is a (broadcast) matmul
+    total_aeff = response @ total_aeff
 
     edges = (e_nu, cos_theta, e_shower, psi_bins)
 
@@ -881,6 +1010,26 @@ def create_starting_aeff(
     }
 
 
+@lru_cache()
+def _load_ara_aeff(fpath):
+    """
+    Parse an ARAsim effective area table
+
+    :returns: a tuple (exponent, cos_theta, aeff). *exponent* is log10 of the
+        neutrino energy in eV, and the axes of *aeff* are energy and cos_theta.
+    """
+    with open(fpath) as f:
+        energy = np.array(re.findall(r"EXPONENT\s*=\s*(\S+)", f.read()), dtype=float)
+    # blocks of (cos_theta, aeff) rows, one for each EXPONENT header
+    table = np.loadtxt(fpath, comments="EXPONENT").reshape(energy.size, -1, 2)
+    cos_theta = table[-1, :, 0]
+    # ara aeffs have zenith pointing in neutrino direction
+    aeff = table[:, ::-1, 1]
+    for v in energy, cos_theta, aeff:
+        v.setflags(write=False)
+    return energy, cos_theta, aeff
+
+
 def _interpolate_ara_aeff(ct_edges=None, depth=200, nstations=37):
     """
     Get the aeff for a neutrino of energy E_nu from zenith angle
@@ -894,67 +1043,41 @@ def _interpolate_ara_aeff(ct_edges=None, depth=200, nstations=37):
         edges in E_nu, cos_theta, while *aeff* is a 2D array
         with the same axes.
     """
-    from scipy import interpolate
-
-    if ct_edges is None:
-        ct_edges = np.linspace(-1, 1, 11)
-    elif isinstance(ct_edges, int):
-        nside = ct_edges
-        ct_edges = _ring_range(nside)
+    ct_edges = _normalize_ct_edges(ct_edges)
     # interpolate to a grid compatible with the IceCube/Gen2 effective areas
     loge_edges = np.linspace(2, 12, 101)
 
     fpath = os.path.join(data_dir, "aeff", "cosZenDepAeff_z{}.half.txt".format(depth))
+    energy, cos_theta, aeff = _load_ara_aeff(fpath)
 
-    with open(fpath) as fara:
-        # parse file and strip out empty lines
-        lines = filter(None, (line.rstrip() for line in fara))
-
-        energy = []
-        cos_theta = []
-        aeff = []
-        paeff = []  # partial aeff over a single energy range
-        for fline in lines:
-            if "EXPONENT" in fline:
-                energy.append(float(fline.split("=")[-1]))
-                if paeff:
-                    paeff.reverse()
-                    aeff.append(paeff)
-                    paeff = []
-                    cos_theta = []
-            else:
-                cos_theta.append(float(fline.split()[0]))
-                paeff.append(float(fline.split()[1]))
-        # ara aeffs have zenith pointing in neutrino direction
-        paeff.reverse()
-        aeff.append(paeff)
-
-    aeff = np.asarray(aeff) * nstations
+    aeff = aeff * nstations
 
     # convert energy from exponent to GeV
     # energy = 10**edge(np.asarray(energy))*1e-9
 
-    centers = (np.asarray(energy) - 9, np.asarray(cos_theta))
+    centers = (energy - 9, cos_theta)
 
-    edges = np.array([energy, cos_theta])
     # centers = map(center, edges)
     newcenters = [
         center(loge_edges),
         np.clip(center(ct_edges), centers[1].min(), centers[1].max()),
     ]
-    xi = np.vstack([x.flatten() for x in np.meshgrid(*newcenters, indexing="ij")]).T
-    assert np.isfinite(xi).all()
+    assert all(np.isfinite(x).all() for x in newcenters)
 
-    interpolant = interpolate.RegularGridInterpolator(
-        centers, aeff, bounds_error=False, fill_value=0
-    )
     # NB: we use nearest-neighbor interpolation here because
     # n-dimensional linear interpolation has the unfortunate side-effect
     # of dropping the highest-energy muon energy bin in each neutrino
     # energy bin, in turn because the next-highest-energy bin is zero
     # (-inf in log space). Ignoring that bin significantly
     # underestimates the muon flux from steeply falling neutrino spectra.
-    v = interpolant(xi, method="nearest").reshape([x.size for x in newcenters])
+    # Energies outside the table get zero effective area.
+    loge = newcenters[0]
+    in_range = (loge >= centers[0][0]) & (loge <= centers[0][-1])
+    idx = np.ix_(
+        _nearest_index(centers[0], np.clip(loge, centers[0][0], centers[0][-1])),
+        _nearest_index(centers[1], newcenters[1]),
+    )
+    v = np.where(in_range[:, None], aeff[idx], 0)
 
     # assume flavor-independence for ARA by extending same aeff across all flavors
     return (10**loge_edges, ct_edges), np.repeat(v[None, ...], 6, axis=0)
@@ -964,6 +1087,7 @@ def create_ara_aeff(
     depth=200,
     nstations=37,
     cos_theta=None,
+    dtype=np.float64,
 ):
     """
     Create an effective area for ARA
@@ -976,6 +1100,9 @@ def create_ara_aeff(
         zenith angle. If None, use the native binning of the muon production
         efficiency histogram.
     :param psi_bins: edges of bins in muon/reconstruction opening angle (radians)
+    :param dtype: floating-point type of the effective area table. Use
+        np.float32 to halve its memory footprint and bandwidth at the cost of
+        precision.
 
     :returns: an effective_area object
     """
@@ -994,13 +1121,13 @@ def create_ara_aeff(
     # aeff = np.repeat(aeff[...,None], aeff.shape[1], axis=-1)
     # aeff /= aeff.shape[1]
     e_reco = np.array([e_nu[0], e_nu[-1]])
-    aeff = aeff[..., None]
 
     # Step 3: dummy angular resolution smearing
     psi_bins = np.asarray([0, np.inf])
-    total_aeff = np.zeros(aeff.shape + (psi_bins.size - 1,))
-    # put everything in first psi_bin for no angular resolution
-    total_aeff[..., 0] = aeff[...]
+    # put everything in first (and only) psi_bin for no angular resolution.
+    # NB: there is exactly one reco energy and one psi bin, so this is just a
+    # reshape; no need to zero-fill a table and then overwrite all of it
+    total_aeff = aeff[..., None, None].astype(dtype)
 
     edges = (e_nu, cos_theta, e_reco, psi_bins)
 
@@ -1090,9 +1217,16 @@ def create_radio_aeff(
     ),
     cos_theta=np.linspace(-1, 1, 21),
     neutrino_energy=np.logspace(6, 12, 61),
+    dtype=np.float64,
 ):
     """
     Create an effective area for a nameless radio array
+
+    :param dtype: floating-point type of the effective area table. Use
+        np.float32 to halve its memory footprint and bandwidth at the cost of
+        precision.
+
+    :returns: an effective_area object
     """
     nside = None
     if isinstance(cos_theta, int):
@@ -1102,6 +1236,7 @@ def create_radio_aeff(
     (e_nu, cos_theta, e_shower), aeff = calculate_cascade_production_density(
         cos_theta, neutrino_energy
     )
+    ct_center = center(cos_theta)
 
     # Step 2: Effective volume in terms of shower energy
     # NB: this includes selection efficiency (usually step 3)
@@ -1120,17 +1255,23 @@ def create_radio_aeff(
     # Add an overflow bin if none present
     if np.isfinite(psi_bins[-1]):
         psi_bins = np.concatenate((psi_bins, [np.inf]))
-    cdf = eval_psf(psf, center(e_shower), center(cos_theta), psi_bins[:-1])
+    cdf = eval_psf(psf, center(e_shower), ct_center, psi_bins[:-1])
 
-    total_aeff = np.empty(aeff.shape + (psi_bins.size - 1,))
-    # expand differential contributions along the opening-angle axis
-    total_aeff[..., :-1] = aeff[..., None] * np.diff(cdf, axis=2)[None, ...]
+    total_aeff = np.empty(aeff.shape + (psi_bins.size - 1,), dtype=dtype)
+    # expand differential contributions along the opening-angle axis, writing
+    # directly into the output to avoid a temporary the size of total_aeff
+    np.multiply(
+        aeff[..., None], np.diff(cdf, axis=2)[None, ...], out=total_aeff[..., :-1]
+    )
     # put the remainder in the overflow bin
-    total_aeff[..., -1] = aeff * (1 - cdf[..., -1])[None, None, ...]
+    np.multiply(aeff, (1 - cdf[..., -1])[None, None, ...], out=total_aeff[..., -1])
 
     # Step 5: apply smearing for energy resolution
-    response = energy_resolution.get_response_matrix(e_shower, e_shower)
-    total_aeff = np.apply_along_axis(np.inner, 3, total_aeff, response)
+    response = energy_resolution.get_response_matrix(e_shower, e_shower).astype(
+        dtype, copy=False
+    )
+    # NB: energy is the next-to-last axis, so this is a (broadcast) matmul
+    total_aeff = response @ total_aeff
 
     edges = (e_nu, cos_theta, e_shower, psi_bins)
 
@@ -1154,11 +1295,7 @@ def _interpolate_gen2_ehe_aeff(ct_edges=None):
     """
     from scipy import interpolate
 
-    if ct_edges is None:
-        ct_edges = np.linspace(-1, 1, 11)
-    elif isinstance(ct_edges, int):
-        nside = ct_edges
-        ct_edges = _ring_range(nside)
+    ct_edges = _normalize_ct_edges(ct_edges)
 
     # interpolate to a grid compatible with the IceCube/Gen2 effective areas
     loge_edges = np.linspace(2, 12, 101)
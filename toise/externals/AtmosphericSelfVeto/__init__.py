@@ -33,12 +33,18 @@ class AnalyticPassingFraction(object):
             numu = self._get_spline("charm", veto_threshold)
             nue = numu
 
-        self._eval = dict()
-        self._eval[PDGCode.NuMu] = np.vectorize(
-            lambda enu, ct, depth: numu.evaluate_simple([enu, ct, depth])
-        )
-        self._eval[PDGCode.NuE] = np.vectorize(
-            lambda enu, ct, depth: nue.evaluate_simple([enu, ct, depth])
+        self._splines[PDGCode.NuMu] = numu
+        self._splines[PDGCode.NuE] = nue
+
+    def _eval(self, particleType, log_enu, ct, depth):
+        """
+        Evaluate the spline for *particleType* at all points at once
+        """
+        coords = np.broadcast_arrays(log_enu, ct, depth)
+        return (
+            self._splines[particleType]
+            .evaluate_simple([c.ravel() for c in coords])
+            .reshape(coords[0].shape)
         )
 
     def _eval_grid(self, kind, veto_threshold):
@@ -58,14 +64,13 @@ class AnalyticPassingFraction(object):
         depth = np.linspace(1e3, 3e3, 11)
         depth_g = depth[None, None, :]
         log_enu_g, ct_g = list(map(np.transpose, np.meshgrid(log_enu, ct)))
-
-        pr = np.zeros(ct_g.shape + (depth.size,))
-        for i, d in enumerate(depth):
-            slant = selfveto.overburden(ct_g, d)
-            emu = selfveto.minimum_muon_energy(slant, veto_threshold)
-            pr[..., i] = selfveto.uncorrelated_passing_rate(
-                10**log_enu_g, emu, ct_g, kind=kind
-            )
+        # evaluate on the full (energy, zenith, depth) grid at once. only the
+        # muon threshold depends on depth, so the neutrino yields are computed
+        # once per (energy, zenith) and broadcast over depth.
+        enu_g, ct_g = 10 ** log_enu_g[..., None], ct_g[..., None]
+        slant = selfveto.overburden(ct_g, depth_g)
+        emu = selfveto.minimum_muon_energy(slant, veto_threshold)
+        pr = selfveto.uncorrelated_passing_rate(enu_g, emu, ct_g, kind=kind)
 
         centers = [log_enu, ct, depth]
         knots = list(map(pad_knots, list(map(edges, centers))))
@@ -115,31 +120,30 @@ class AnalyticPassingFraction(object):
 
         # Verify that we're using a sane encoding scheme
         assert abs(PDGCode.NuMuBar) == PDGCode.NuMu
-        particleType = abs(np.asarray(particleType))
+        particleType, enu, ct, depth, emu = np.broadcast_arrays(
+            abs(np.asarray(particleType)), enu, ct, depth, emu
+        )
+        # only evaluate where the result is actually used
+        live = ct > self.ct_min
+        pr = np.ones(ct.shape)
         if spline:
-            pr = np.where(
-                particleType == PDGCode.NuMu,
-                self._eval[PDGCode.NuMu](np.log10(enu), ct, depth),
-                np.where(
-                    particleType == PDGCode.NuE,
-                    self._eval[PDGCode.NuE](np.log10(enu), ct, depth),
-                    1,
-                ),
-            )
+            for flavor in PDGCode.NuMu, PDGCode.NuE:
+                mask = live & (particleType == flavor)
+                if mask.any():
+                    pr[mask] = self._eval(
+                        flavor, np.log10(enu[mask]), ct[mask], depth[mask]
+                    )
         else:
-            enu, ct, depth = np.broadcast_arrays(enu, ct, depth)
             if self.kind == "conventional":
-                pr = np.where(
-                    particleType == PDGCode.NuMu,
-                    selfveto.uncorrelated_passing_rate(enu, emu, ct, kind="numu"),
-                    np.where(
-                        particleType == PDGCode.NuE,
-                        selfveto.uncorrelated_passing_rate(enu, emu, ct, kind="nue"),
-                        1,
-                    ),
-                )
+                flavors = [(PDGCode.NuMu, "numu"), (PDGCode.NuE, "nue")]
             elif self.kind == "charm":
-                pr = selfveto.uncorrelated_passing_rate(enu, emu, ct, kind=self.kind)
+                flavors = [(None, self.kind)]
+            for flavor, kind in flavors:
+                mask = live if flavor is None else live & (particleType == flavor)
+                if mask.any():
+                    pr[mask] = selfveto.uncorrelated_passing_rate(
+                        enu[mask], emu[mask], ct[mask], kind=kind
+                    )
 
         # For NuMu specifically there is a guaranteed accompanying muon.
         # Estimate the passing fraction from the fraction of the decay phase
@@ -147,11 +151,12 @@ class AnalyticPassingFraction(object):
         # NB: strictly speaking this calculation applies only to 2-body
         # decays of pions and kaons, but is at least a conservative estimate
         # for 3-body decays of D mesons.
-        direct = selfveto.correlated_passing_rate(enu, emu, ct)
-        pr *= np.where(particleType == PDGCode.NuMu, direct, 1)
-
-        return np.where(
-            ct > self.ct_min,
-            np.where(pr <= 1, np.where(pr >= self.floor, pr, self.floor), 1),
-            1,
-        )
+        mask = live & (particleType == PDGCode.NuMu)
+        if mask.any():
+            pr[mask] *= selfveto.correlated_passing_rate(enu[mask], emu[mask], ct[mask])
+
+        # clamp to [floor, 1] in place. entries above 1 (or nan) are treated
+        # as unvetoed, as are those outside the live region
+        np.maximum(pr, self.floor, out=pr)
+        pr[~(live & (pr <= 1))] = 1
+        return pr
@@ -155,17 +155,14 @@ def elbert_yield(
         decay_prob = 1.0 / (En * effective_costheta(cos_theta))
 
     with fpe_context(all="ignore"):
-        icdf = np.where(
-            x >= 1,
-            0.0,
-            a * primary_mass * decay_prob * x ** (-p1) * (1 - x**p3) ** p2,
-        )
+        # x**p3 appears in both the yield and its derivative; evaluate the
+        # power only once
+        xp3 = x**p3
+        icdf = a * primary_mass * decay_prob * x ** (-p1) * (1 - xp3) ** p2
         if differential:
-            icdf *= (1.0 / En) * np.where(
-                x >= 1, 0.0, (p1 / x + p2 * p3 * x ** (p3 - 1) / (1 - x**p3))
-            )
+            icdf *= (p1 + p2 * p3 * xp3 / (1 - xp3)) / (x * En)
 
-    return icdf
+    return np.where(x >= 1, 0.0, icdf)
 
 
 class ParticleType(object):
@@ -223,7 +220,7 @@ def logspace(start, stop, num):
     stop = np.asarray(stop)[..., None]
     num = int(num)
     step = (stop - start) / float(num - 1)
-    y = (np.core.numeric.arange(0, num) * step + start).squeeze()
+    y = np.core.numeric.arange(0, num) * step + start
     return 10**y
 
 
@@ -1,6 +1,7 @@
 from itertools import product
 
 import numpy as np
+from scipy import linalg
 from toolz import memoize
 
 from .crosssections import DISCrossSection, GlashowResonanceCrossSection
@@ -33,7 +34,7 @@ class NeutrinoCascade(object):
         # Comparing with NuFate paper: multiply by E_j (= E_in) to account
         # for log scale, then by E_i^2/E_j^2 to account for variable change
         # phi -> E^2*phi
-        ei, ej = np.meshgrid(energy_nodes, energy_nodes)
+        ei, ej = energy_nodes[None, :], energy_nodes[:, None]
         self.differential_element = 2 * dloge * (ei**2 / ej)
 
     def transfer_matrix_element(self, i, flavor, out_flavor, column_density):
@@ -52,19 +53,85 @@ class NeutrinoCascade(object):
         # construct a differential flux that is nonzero in only 1 energy bin
         # and integrates to 1
         flux0 = 1.0 / (self._width * self.energy_nodes[i])
-        flux = np.where(np.arange(self.energy_nodes.size) == i, flux0, 0)
-        if out_flavor != flavor:
-            # initial flux of nue/numu is zero
-            flux = np.concatenate([np.zeros_like(flux), flux])
+        num = self.energy_nodes.size
+        # if out_flavor != flavor, the initial flux of nue/numu is zero, and
+        # only the last num entries (the incoming flavor) are populated
+        flux = np.zeros(num if out_flavor == flavor else 2 * num)
+        flux[flux.size - num + i] = flux0
 
         # decompose flux in the eigenbasis of cascade equation solution
         w, v, ci = self.decompose_in_eigenbasis(flux, flavor, out_flavor)
 
         # attenuate components
-        wf = np.exp(w[..., None] * np.asarray(column_density)[None, ...])
+        wf = w[..., None] * np.asarray(column_density)[None, ...]
+        np.exp(wf, out=wf)
+        wf *= ci[..., None]
         # transform back to energy basis and pseudo-integrate to obtain a
         # survival probability
-        return np.dot(v, wf * ci[..., None]).T / flux0
+        return np.dot(v, wf).T / flux0
+
+    def transfer_matrix_elements(self, flavor, out_flavor, column_density):
+        """
+        Calculate all elements of the transfer matrix at once. This is
+        equivalent to stacking :meth:`transfer_matrix_element` for every
+        energy node, but decomposes the unit fluxes in all nodes with a single
+        solve.
+
+        :param flavor: index of neutrino type
+        :param out_flavor: index of outgoing neutrino type
+        :param column_density: number density of scattering centers in cm^2
+        :returns: an array of shape (column_density,energy_nodes,energy_nodes),
+            or (column_density,energy_nodes,2*energy_nodes) if `out_flavor`
+            differs from `flavor`
+        """
+        w, v = self.get_eigenbasis(flavor, out_flavor)
+        # decompose a flux that is nonzero in only 1 energy bin in the
+        # eigenbasis of cascade equation solution, for each energy bin. the
+        # normalization of the flux cancels in the survival probability.
+        # if out_flavor != flavor, the initial flux of nue/numu is zero.
+        num = self.energy_nodes.size
+        ci = linalg.lu_solve(
+            self.get_eigenbasis_lu(flavor, out_flavor), np.eye(w.size)[:, -num:]
+        )
+
+        # attenuate components
+        wf = w[..., None] * np.asarray(column_density)[None, ...]
+        np.exp(wf, out=wf)
+        wf = np.moveaxis(wf, 0, -1)[..., None, :] * ci.T
+        # transform back to energy basis in a single matrix product
+        return np.dot(wf.reshape(-1, w.size), v.T).reshape(wf.shape)
+
+    def transfer_matrix_blocks(self, cos_zenith, depth=0.5):
+        """
+        Calculate the nonzero blocks of :meth:`transfer_matrix`. Only 10 of the
+        36 combinations of initial and final neutrino type are populated: one
+        for each type, plus the neutrinos from tau decay.
+
+        :param cos_zenith: cosine of angle between neutrino arrival direction and local zenith
+        :param depth: depth below the Earth's surface, in km
+        :returns: a dict mapping (initial type, final type) to an array of
+            shape (T,N,N), where T is the broadcast shape of `cos_zenith` and
+            `depth`, and N is the number of energy nodes.
+        """
+        # find [number] column density of nucleons along the trajectory in cm^-2
+        t = np.atleast_1d(np.vectorize(get_t_earth)(np.arccos(cos_zenith), depth) * Na)
+
+        blocks = dict()
+        # nu_e, nu_mu: CC absorption and NC downscattering
+        for flavor in range(4):
+            blocks[flavor, flavor] = self.transfer_matrix_elements(flavor, flavor, t)
+
+        # nu_tau: CC absorption and NC downscattering, plus neutrinos
+        # from tau decay
+        for flavor in range(4, 6):
+            for out_flavor in range(flavor % 2, flavor, 2):
+                secondary, tau = np.split(
+                    self.transfer_matrix_elements(flavor, out_flavor, t), 2, axis=-1
+                )
+                blocks[flavor, flavor] = tau
+                blocks[flavor, out_flavor] = secondary
+
+        return blocks
 
     def transfer_matrix(self, cos_zenith, depth=0.5):
         """
@@ -78,29 +145,13 @@ class NeutrinoCascade(object):
             of `cos_zenith` and `depth`, and N is the number of energy nodes.
             In other words, the array contains a transfer matrix for each
             combination of initial neutrino type, final neutrino type, and
-            trajectory.
+            trajectory. Most of these are zero; see
+            :meth:`transfer_matrix_blocks` for a compact form.
         """
-        # find [number] column density of nucleons along the trajectory in cm^-2
-        t = np.atleast_1d(np.vectorize(get_t_earth)(np.arccos(cos_zenith), depth) * Na)
-
-        num = self.energy_nodes.size
-        transfer_matrix = np.zeros((6, 6) + t.shape + (num, num))
-        for i in range(self.energy_nodes.size):
-            # nu_e, nu_mu: CC absorption and NC downscattering
-            for flavor in range(4):
-                transfer_matrix[flavor, flavor, :, i, :] = self.transfer_matrix_element(
-                    i, flavor, flavor, t
-                )
-
-            # nu_tau: CC absorption and NC downscattering, plus neutrinos
-            # from tau decay
-            for flavor in range(4, 6):
-                for out_flavor in range(flavor % 2, flavor, 2):
-                    secondary, tau = np.hsplit(
-                        self.transfer_matrix_element(i, flavor, out_flavor, t), 2
-                    )
-                    transfer_matrix[flavor, flavor, :, i, :] = tau
-                    transfer_matrix[flavor, out_flavor, :, i, :] = secondary
+        blocks = self.transfer_matrix_blocks(cos_zenith, depth)
+        transfer_matrix = np.zeros((6, 6) + blocks[0, 0].shape)
+        for (flavor, out_flavor), block in blocks.items():
+            transfer_matrix[flavor, out_flavor, ...] = block
 
         return transfer_matrix
 
@@ -110,15 +161,18 @@ class NeutrinoCascade(object):
         flux = flux0
         if out_flavor != flavor:
             # initial flux of nue/numu is zero
-            flux0 = np.concatenate([flux, flux])
-            flux = np.concatenate([np.zeros_like(flux), flux])
+            flux = np.zeros(2 * flux0.size)
+            flux[flux0.size :] = flux0
+            flux0 = np.tile(flux0, 2)
         # decompose flux in the eigenbasis of cascade equation solution
         w, v, ci = self.decompose_in_eigenbasis(flux, flavor, out_flavor)
         # attenuate components
-        wf = np.exp(w[..., None] * np.asarray(column_density)[None, ...])
+        wf = w[..., None] * np.asarray(column_density)[None, ...]
+        np.exp(wf, out=wf)
+        wf *= ci[..., None]
         # transform back to energy basis and pseudo-integrate to obtain a
         # survival probability
-        return np.dot(v, wf * ci[..., None]).T / flux0
+        return np.dot(v, wf).T / flux0
 
     def attenuation(self, flux, cos_zenith, depth=0.5, scale=1):
         """
@@ -140,13 +194,16 @@ class NeutrinoCascade(object):
         flux = np.atleast_2d(flux)
         if flux.shape[0] == 1:
             flux = np.repeat(flux, 6, axis=0)
-        assert flux.shape == (6, self.energy_nodes)
+        assert flux.shape == (
+            6,
+            self.energy_nodes.size,
+        ), "flux must have one row per neutrino type and one column per energy node"
 
         num = self.energy_nodes.size
-        flux = np.zeros((6,) + t.shape + (num,))
+        ratio = np.zeros((6,) + t.shape + (num,))
         # nu_e, nu_mu: CC absorption and NC downscattering
         for flavor in range(4):
-            flux[flavor, ...] = self._attenuation_for_flavor(
+            ratio[flavor, ...] = self._attenuation_for_flavor(
                 flux[flavor, :], flavor, flavor, t
             )
 
@@ -161,11 +218,11 @@ class NeutrinoCascade(object):
                     2,
                 )
                 # one contribution each to nu_e and nu_mu
-                flux[out_flavor, ...] += secondary
+                ratio[out_flavor, ...] += secondary
             # only one contribution to nu_tau
-            flux[flavor, ...] += tau
+            ratio[flavor, ...] += tau
 
-        return flux
+        return ratio
 
     @staticmethod
     @memoize
@@ -261,9 +318,10 @@ class NeutrinoCascade(object):
         :returns: (w,v,ci), the eigenvalues, eigenvectors, and coefficients of `flux` in the basis `v`
         """
         w, v = self.get_eigenbasis(flavor, out_flavor)
-        ci = np.linalg.solve(v, flux)
+        ci = linalg.lu_solve(self.get_eigenbasis_lu(flavor, out_flavor), flux)
         return w, v, ci
 
+    @memoize
     def _sink_matrix(self, flavor):
         """
         Return a matrix with total interaction cross-section on the diagonal
@@ -272,6 +330,7 @@ class NeutrinoCascade(object):
         """
         return np.diag(self.total_cross_section(flavor))
 
+    @memoize
     def _source_matrix(self, flavor, out_flavor):
         """
         Return a matrix with E^2-weighted differential neutrino cross-sections below the diagonal
@@ -320,6 +379,18 @@ class NeutrinoCascade(object):
         w, v = np.linalg.eig(RHSMatrix)
         return w, v
 
+    @memoize
+    def get_eigenbasis_lu(self, flavor, out_flavor):
+        """
+        LU factorization of the eigenvectors returned by :meth:`get_eigenbasis`,
+        shared by all decompositions into that eigenbasis
+
+        :param flavor: incoming neutrino flavor
+        :param out_flavor: outgoing neutrino flavor
+        :returns: (lu,piv) as returned by :func:`scipy.linalg.lu_factor`
+        """
+        return linalg.lu_factor(self.get_eigenbasis(flavor, out_flavor)[1])
+
 
 class NeutrinoCascadeToShowers(NeutrinoCascade):
     def __differential_cross_section(self, enu, ef, flavor, channel):
@@ -375,28 +446,23 @@ class NeutrinoCascadeToShowers(NeutrinoCascade):
         # [d\sigma/dE \rho N_A \delta E] = [(cm^2 GeV^-1) (g cm^-3) (g^-1) (GeV) (cm m^-1)] = [m^-1]
         density_factor = 1.020 * Na * 100
         enu, ef = np.meshgrid(self.energy_nodes, self.energy_nodes, indexing="ij")
+        # only deposits below the neutrino energy contribute, so evaluate the
+        # cross-sections on those cells alone
+        de = enu - ef
+        below = de > 0
+        enu, de = enu[below], de[below]
         # all flavors contribute at least to NC
-        xsec = np.where(
-            enu - ef > 0,
-            self.__differential_cross_section(enu, enu - ef, flavor, "NC"),
-            0,
-        )
+        contrib = self.__differential_cross_section(enu, de, flavor, "NC")
         # for CC numu, we see only the initial cascade
         if flavor in (2, 3):
-            xsec += np.where(
-                enu - ef > 0,
-                self.__differential_cross_section(enu, enu - ef, flavor, "CC"),
-                0,
-            )
+            contrib += self.__differential_cross_section(enu, de, flavor, "CC")
         # for CC nutau, we can see the tau decay (and neglect the initial cascade)
         if flavor in (4, 5):
-            xsec += np.where(
-                enu - ef > 0,
-                self.__differential_final_state_cross_section(
-                    enu, enu - ef, flavor, "CC"
-                ),
-                0,
+            contrib += self.__differential_final_state_cross_section(
+                enu, de, flavor, "CC"
             )
+        xsec = np.zeros(below.shape)
+        xsec[below] = contrib
         # pseudo-integrate over differential cross-sections
         xsec *= self.energy_nodes * self._width
         if flavor < 2:
@@ -427,28 +493,31 @@ class NeutrinoCascadeToShowers(NeutrinoCascade):
 
         num = self.energy_nodes.size
         transfer_matrix = np.zeros((6, num) + t.shape + (num,))
-        for i in range(self.energy_nodes.size):
-            # nu_e, nu_mu: CC absorption and NC downscattering
-            for flavor in range(4):
-                transfer_matrix[flavor, i, ...] += np.dot(
-                    self.transfer_matrix_element(i, flavor, flavor, t),
-                    self.interaction_density(flavor),
-                )
+        # view with the initial energy node moved next to the final one
+        target = np.moveaxis(transfer_matrix, 1, -2)
+        # NB: matmul contracts the stacked elements with one GEMM per
+        # trajectory, where np.dot would fall back to a much slower loop
+        # nu_e, nu_mu: CC absorption and NC downscattering
+        for flavor in range(4):
+            target[flavor, ...] += np.matmul(
+                self.transfer_matrix_elements(flavor, flavor, t),
+                self.interaction_density(flavor),
+            )
 
-            # nu_tau: CC absorption and NC downscattering, plus neutrinos
-            # from tau decay
-            for flavor in range(4, 6):
-                for out_flavor in range(flavor % 2, flavor, 2):
-                    secondary, tau = np.hsplit(
-                        self.transfer_matrix_element(i, flavor, out_flavor, t), 2
-                    )
-                    transfer_matrix[flavor, i, ...] += np.dot(
-                        secondary, self.interaction_density(out_flavor)
+        # nu_tau: CC absorption and NC downscattering, plus neutrinos
+        # from tau decay
+        for flavor in range(4, 6):
+            for out_flavor in range(flavor % 2, flavor, 2):
+                secondary, tau = np.split(
+                    self.transfer_matrix_elements(flavor, out_flavor, t), 2, axis=-1
+                )
+                target[flavor, ...] += np.matmul(
+                    secondary, self.interaction_density(out_flavor)
+                )
+                # do not double-count tau contribution
+                if out_flavor == flavor % 2:
+                    target[flavor, ...] += np.matmul(
+                        tau, self.interaction_density(flavor)
                     )
-                    # do not double-count tau contribution
-                    if out_flavor == flavor % 2:
-                        transfer_matrix[flavor, i, ...] += np.dot(
-                            tau, self.interaction_density(flavor)
-                        )
 
         return transfer_matrix
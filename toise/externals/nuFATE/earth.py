@@ -1,11 +1,30 @@
 """ Funcitons to evaluate the Earth density.
 """
+import bisect
+import math
+
 import numpy as np
 import scipy.integrate as integrate
 
 REarth = 6371.0  # Earth radius in km.
 
 
+# piecewise polynomial fit to Reference earth model STW105: outer radius of
+# each shell in km, and coefficients (p1, p2, p3) of the density in kg/m^3
+# inside each shell, rho = p1 * r**2 + p2 * r + p3
+SHELL_RADII = (1221.0, 3480, 5721, 5961, 6347, 6356, 6368)
+SHELL_COEFFICIENTS = (
+    (-0.0002177, -4.265e-06, 1.309e04),
+    (-0.0002409, 0.1416, 1.234e04),
+    (-3.764e-05, -0.1876, 6664),
+    (0.0, -1.269, 1.131e04),
+    (0.0, -0.725, 7887.0),
+    (0, 0, 2900),
+    (0, 0, 2600),
+    (0, 0, 1020),
+)
+
+
 def rho_earth(theta, x, d=0):
     """Returns the Earth density in gr/cm^3.
 
@@ -18,43 +37,13 @@ def rho_earth(theta, x, d=0):
         rho: density in gr/cm^3
     """
     # 	theta = angle from down vector (0 = direction north pole...if you're at IceCube)
-    # piecewise polynomial fit to Reference earth model STW105
     # you could also load a Ref earth model if you want.
 
-    r = np.sqrt((REarth - d) ** 2 + x**2 + 2.0 * (REarth - d) * x * np.cos(theta))
-
-    if r < 1221.0:
-        p1 = -0.0002177
-        p2 = -4.265e-06
-        p3 = 1.309e04
-    elif r < 3480:
-        p1 = -0.0002409
-        p2 = 0.1416
-        p3 = 1.234e04
-    elif r < 5721:
-        p1 = -3.764e-05
-        p2 = -0.1876
-        p3 = 6664
-    elif r < 5961:
-        p1 = 0.0
-        p2 = -1.269
-        p3 = 1.131e04
-    elif r < 6347:
-        p1 = 0.0
-        p2 = -0.725
-        p3 = 7887.0
-    elif r < 6356:
-        p1 = 0
-        p2 = 0
-        p3 = 2900
-    elif r < 6368:
-        p1 = 0
-        p2 = 0
-        p3 = 2600
-    else:
-        p1 = 0
-        p2 = 0
-        p3 = 1020
+    # this is the integrand of get_t_earth, so use scalar math rather than
+    # numpy ufuncs
+    r = math.sqrt((REarth - d) ** 2 + x**2 + 2.0 * (REarth - d) * x * math.cos(theta))
+
+    p1, p2, p3 = SHELL_COEFFICIENTS[bisect.bisect_right(SHELL_RADII, r)]
 
     rho = p1 * r**2 + p2 * r + p3
 
@@ -77,10 +66,7 @@ def get_t_earth(theta, d=0):
     kmTocm = 1.0e5
 
     def n(x):
-        return rho_earth(theta, x, d)  # mass density
+        return rho_earth(theta, xmax - x, d)  # mass density
 
-    t = (
-        integrate.quad(lambda x: n(xmax - x), 0, xmax, epsrel=1.0e-3, epsabs=1.0e-18)[0]
-        * kmTocm
-    )  # g/cm^2
+    t = integrate.quad(n, 0, xmax, epsrel=1.0e-3, epsabs=1.0e-18)[0] * kmTocm  # g/cm^2
     return t
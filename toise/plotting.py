@@ -11,17 +11,15 @@ def stepped_path(edges, bins, cumulative=False):
     if len(edges) != len(bins) + 1:
         raise ValueError("edges must be 1 element longer than bins")
 
-    x = np.zeros((2 * len(edges)))
-    y = np.zeros((2 * len(edges)))
-
     if cumulative is not False:
         if cumulative == "<":
             bins = bins.cumsum()
         elif cumulative == ">":
             bins = bins[::-1].cumsum()[::-1]
 
-    x[0::2], x[1::2] = edges, edges
-    y[1:-1:2], y[2::2] = bins, bins
+    x = np.repeat(np.asarray(edges, dtype=float), 2)
+    y = np.zeros(x.size)
+    y[1:-1] = np.repeat(bins, 2)
 
     return x, y
 
@@ -1,11 +1,10 @@
 import logging
 from copy import copy
-from functools import partial
+from functools import lru_cache
 from io import StringIO
 
 import numpy as np
 from scipy import interpolate, optimize, stats
-from scipy.optimize import bisect
 
 from .multillh import asimov_llh, get_expectations
 from .util import *
@@ -39,25 +38,32 @@ class PointSource(object):
 
         if is_zenith_weight(zenith_selection, effective_area):
             zenith_dim = effective_area.dimensions.index("true_zenith_band")
-            expand = [None] * effective_area.values.ndim
-            expand[zenith_dim] = slice(None)
-            effective_area = (
-                effective_area.values[..., :-1] * zenith_selection[tuple(expand)]
-            ).sum(axis=zenith_dim)
+            # contract over zenith bands without materializing the weighted
+            # product. the remaining axes keep their order.
+            effective_area = np.tensordot(
+                effective_area.values[..., :-1],
+                zenith_selection,
+                axes=([zenith_dim], [0]),
+            )
         else:
             effective_area = effective_area.values[..., zenith_selection, :, :-1]
         expand = [None] * effective_area.ndim
         expand[1] = slice(None)
         if len(fluence.shape) > 1 and fluence.shape[1] > 1:
             expand[2] = slice(None)
-        # 1/yr
-        rate = fluence[tuple(expand)] * (effective_area * 1e4)
+        # 1/yr. scale in place to avoid a second full-sized temporary
+        rate = effective_area * 1e4
+        rate *= fluence[tuple(expand)]
 
         assert np.isfinite(rate).all()
 
         self._use_energies = with_energy
 
-        self._rate = rate
+        # the spectral weights do not depend on flavor, so sum over it once.
+        # NB: this is shared between self and its chunks
+        self._flavor_summed_rate = rate.sum(axis=0)
+        # range of neutrino energy bins to include (see differential_chunks())
+        self._ebin_range = (0, rate.shape[1])
         self._invalidate_cache()
 
     def _invalidate_cache(self):
@@ -79,11 +85,12 @@ class PointSource(object):
         centers = 0.5 * (energy[1:] + energy[:-1])
         specweight = self.spectral_weight(centers, **kwargs)
 
-        expand = [None] * (self._rate.ndim)
-        expand[1] = slice(None)
-
         # FIXME: this still neglects the opening angle between neutrino and muon
-        total = (self._rate * (specweight[tuple(expand)])).sum(axis=(0, 1))
+        start, stop = self._ebin_range
+        # contract over neutrino energy without forming the weighted rate
+        total = np.tensordot(
+            specweight[start:stop], self._flavor_summed_rate[start:stop], axes=(0, 0)
+        )
         # assert total.ndim == 2
 
         if not self._use_energies:
@@ -98,13 +105,19 @@ class PointSource(object):
         start = max((0, start - 1))
         chunk = copy(self)
         chunk._invalidate_cache()
-        # zero out the neutrino flux outside the given range
-        chunk._rate = self._rate.copy()
-        chunk._rate[:, :start, ...] = 0
-        chunk._rate[:, stop:, ...] = 0
+        # restrict the neutrino flux to the given range
+        chunk._ebin_range = self._restrict_ebin_range(start, stop)
         chunk.energy_range = (ebins[start], ebins[stop])
         return chunk
 
+    def _restrict_ebin_range(self, start, stop):
+        """
+        Intersect [start, stop) with the range of neutrino energy bins
+        already included
+        """
+        lo, hi = self._ebin_range
+        return (max((start, lo)), min((stop, hi)))
+
     def differential_chunks(
         self, decades=1, emin=-np.inf, emax=np.inf, exclusive=False
     ):
@@ -133,15 +146,40 @@ class PointSource(object):
             stop = min((start + bin_range, loge.size - 1))
             chunk = copy(self)
             chunk._invalidate_cache()
-            # zero out the neutrino flux outside the given range
-            chunk._rate = self._rate.copy()
-            chunk._rate[:, :start, ...] = 0
-            chunk._rate[:, stop:, ...] = 0
+            # restrict the neutrino flux to the given range
+            chunk._ebin_range = self._restrict_ebin_range(start, stop)
             e_center = 10 ** (0.5 * (loge[start] + loge[stop]))
             chunk.energy_range = (10 ** loge[start], 10 ** loge[stop])
             yield e_center, chunk
 
 
+def _reference_fluence(energy, livetime):
+    """
+    Integrate the reference flux over energy bins
+
+    The reference flux is E^2 Phi = 1e-12 TeV cm^-2 s^-1. Remember: fluxes are
+    defined as neutrino + antineutrino, so the flux per particle (which is
+    returned here) is .5e-12
+
+    :param energy: edges of neutrino energy bins, in GeV
+    :param livetime: observation time, in years
+    :returns: fluence per particle in each bin, in 1/cm^2
+    """
+
+    def intflux(e, gamma):
+        return (e ** (1 + gamma)) / (1 + gamma)
+
+    tev = energy / 1e3
+    return (
+        0.5e-12
+        * (intflux(tev[1:], -2) - intflux(tev[:-1], -2))
+        * livetime
+        * 365
+        * 24
+        * 3600
+    )
+
+
 class SteadyPointSource(PointSource):
     r"""
     A stead point source of neutrinos.
@@ -160,23 +198,9 @@ class SteadyPointSource(PointSource):
         emax=np.inf,
         with_energy=True,
     ):
-        # reference flux is E^2 Phi = 1e-12 TeV cm^-2 s^-1
-        # remember: fluxes are defined as neutrino + antineutrino, so the flux
-        # per particle (which we need here) is .5e-12
-        def intflux(e, gamma):
-            return (e ** (1 + gamma)) / (1 + gamma)
-
         energy = effective_area.bin_edges[0]
-        tev = energy / 1e3
         # 1/cm^2 yr
-        fluence = (
-            0.5e-12
-            * (intflux(tev[1:], -2) - intflux(tev[:-1], -2))
-            * livetime
-            * 365
-            * 24
-            * 3600
-        )
+        fluence = _reference_fluence(energy, livetime)
         # zero out fluence outside energy range
         fluence[(energy[:-1] > emax) | (energy[1:] < emin)] = 0
 
@@ -186,22 +210,8 @@ class SteadyPointSource(PointSource):
 
 class WBSteadyPointSource(PointSource):
     def __init__(self, effective_area, livetime, zenith_bin, with_energy=True):
-        # reference flux is E^2 Phi = 1e-12 TeV^2 cm^-2 s^-1
-        # remember: fluxes are defined as neutrino + antineutrino, so the flux
-        # per particle (which we need here) is .5e-12
-        def intflux(e, gamma):
-            return (e ** (1 + gamma)) / (1 + gamma)
-
-        tev = effective_area.bin_edges[0] / 1e3
         # 1/cm^2 yr
-        fluence = (
-            0.5e-12
-            * (intflux(tev[1:], -2) - intflux(tev[:-1], -2))
-            * livetime
-            * 365
-            * 24
-            * 3600
-        )
+        fluence = _reference_fluence(effective_area.bin_edges[0], livetime)
 
         # scale by the WB GRB fluence, normalized to the E^-2 flux between 100 TeV and 10 PeV
         from .grb import WaxmannBahcallFluence
@@ -219,22 +229,8 @@ class WBSteadyPointSource(PointSource):
 
 class NSNSMerger(PointSource):
     def __init__(self, effective_area, livetime, zenith_bin, with_energy=True):
-        # reference flux is E^2 Phi = 1e-12 TeV^2 cm^-2 s^-1
-        # remember: fluxes are defined as neutrino + antineutrino, so the flux
-        # per particle (which we need here) is .5e-12
-        def intflux(e, gamma):
-            return (e ** (1 + gamma)) / (1 + gamma)
-
-        tev = effective_area.bin_edges[0] / 1e3
         # 1/cm^2 yr
-        fluence = (
-            0.5e-12
-            * (intflux(tev[1:], -2) - intflux(tev[:-1], -2))
-            * livetime
-            * 365
-            * 24
-            * 3600
-        )
+        fluence = _reference_fluence(effective_area.bin_edges[0], livetime)
 
         # scale by the WB GRB fluence, normalized to the E^-2 flux between 100 TeV and 10 PeV
         from .nsns import NSNS
@@ -252,22 +248,8 @@ class NSNSMerger(PointSource):
 
 class TruncatedSteadyPointSource(PointSource):
     def __init__(self, effective_area, livetime, zenith_bin, with_energy=True):
-        # reference flux is E^2 Phi = 1e-12 TeV^2 cm^-2 s^-1
-        # remember: fluxes are defined as neutrino + antineutrino, so the flux
-        # per particle (which we need here) is .5e-12
-        def intflux(e, gamma):
-            return (e ** (1 + gamma)) / (1 + gamma)
-
-        tev = effective_area.bin_edges[0] / 1e3
         # 1/cm^2 yr
-        fluence = (
-            0.5e-12
-            * (intflux(tev[1:], -2) - intflux(tev[:-1], -2))
-            * livetime
-            * 365
-            * 24
-            * 3600
-        )
+        fluence = _reference_fluence(effective_area.bin_edges[0], livetime)
         # scale by the WB GRB fluence, normalized to the E^-2 flux between 100
         # TeV and 10 PeV
         from .grb import WaxmannBahcallFluence
@@ -307,12 +289,14 @@ powerlaw = powerlaw_gen(name="powerlaw", a=1.0)
 class StackedPopulation(PointSource):
     @staticmethod
     def draw_source_strengths(n_sources):
-        # draw relative source strengths
-        scd = powerlaw(gamma=2.5)
-        strengths = scd.rvs(n_sources)
+        # draw relative source strengths by inverting the CDF of the powerlaw
+        # SCD directly (see powerlaw_gen._ppf), bypassing the rv_continuous
+        # machinery
+        gamma = 2.5
+        strengths = (1.0 - np.random.uniform(size=n_sources)) ** (1.0 / (1.0 - gamma))
         # scale strengths so that the median of the maximum is at 1
         # (the CDF of the maximum of N iid samples is the Nth power of the individual CDF)
-        strengths /= scd.ppf(0.5 ** (1.0 / n_sources))
+        strengths /= (1.0 - 0.5 ** (1.0 / n_sources)) ** (1.0 / (1.0 - gamma))
         return strengths
 
     @staticmethod
@@ -333,25 +317,22 @@ class StackedPopulation(PointSource):
 
         # scatter sources through the zenith bands isotropically
         zenith_bins = effective_area.bin_edges[1]
-        self.sources_per_band = np.histogram(-sindecs, bins=zenith_bins)[0]
-        self.flux_per_band = np.histogram(-sindecs, bins=zenith_bins, weights=fluxes)[0]
-
-        # reference flux is E^2 Phi = 1e-12 TeV^2 cm^-2 s^-1
-        # remember: fluxes are defined as neutrino + antineutrino, so the flux
-        # per particle (which we need here) is .5e-12
-        def intflux(e, gamma):
-            return (e ** (1 + gamma)) / (1 + gamma)
+        # digitize once and count with and without weights. bins are
+        # half-open except for the last, which includes its right edge (as in
+        # np.histogram)
+        nbins = len(zenith_bins) - 1
+        ct = -np.asarray(sindecs)
+        idx = np.searchsorted(zenith_bins, ct, side="right") - 1
+        idx[ct == zenith_bins[-1]] = nbins - 1
+        valid = (idx >= 0) & (idx < nbins)
+        idx = idx[valid]
+        self.sources_per_band = np.bincount(idx, minlength=nbins)
+        self.flux_per_band = np.bincount(
+            idx, weights=np.asarray(fluxes, dtype=float)[valid], minlength=nbins
+        )
 
-        tev = effective_area.bin_edges[0] / 1e3
         # 1/cm^2 yr
-        fluence = (
-            0.5e-12
-            * (intflux(tev[1:], -2) - intflux(tev[:-1], -2))
-            * livetime
-            * 365
-            * 24
-            * 3600
-        )
+        fluence = _reference_fluence(effective_area.bin_edges[0], livetime)
         fluence = np.outer(fluence, self.flux_per_band)
 
         super(StackedPopulation, self).__init__(
@@ -383,9 +364,14 @@ def source_to_local_zenith(declination, latitude, ct_bins):
     # source never crosses the band
     hour_angle[: lo + 1] = np.pi
     hour_angle[hi:] = 0
-    # source enters or exits
-    hour_angle[lo + 1 : hi] = list(
-        map(partial(bisect, offset, 0, np.pi), ct_bins[lo + 1 : hi])
+    # source enters or exits. solve offset(hour_angle, ct) == 0 directly
+    hour_angle[lo + 1 : hi] = np.arccos(
+        np.clip(
+            (ct_bins[lo + 1 : hi] - np.sin(dec) * np.sin(lat))
+            / (np.cos(dec) * np.cos(lat)),
+            -1,
+            1,
+        )
     )
 
     return abs(np.diff(hour_angle)) / np.pi
@@ -395,13 +381,10 @@ def nevents(llh, **hypo):
     """
     Total number of events predicted by hypothesis *hypo*
     """
-    for k in llh.components:
+    for k, component in llh.components.items():
         if not k in hypo:
-            if hasattr(llh.components[k], "seed"):
-                hypo[k] = llh.components[k].seed
-            else:
-                hypo[k] = 1
-    return sum(map(np.sum, llh.expectations(**hypo).values()))
+            hypo[k] = getattr(component, "seed", 1)
+    return sum(values.sum() for values in llh.expectations(**hypo).values())
 
 
 def discovery_potential(
@@ -434,10 +417,10 @@ def discovery_potential(
     components = dict(ps=point_source)
     components.update(diffuse_components)
 
-    def ts(flux_norm):
-        """
-        Test statistic of flux_norm against flux norm=0
-        """
+    # NB: fsolve evaluates its starting point twice, and the solution is
+    # evaluated again below, so memoize the (expensive) fits
+    @lru_cache(maxsize=None)
+    def _ts(flux_norm):
         allh = asimov_llh(components, ps=flux_norm, **fixed)
         if len(fixed) == len(diffuse_components):
             return -2 * (allh.llh(ps=0, **fixed) - allh.llh(ps=flux_norm, **fixed))
@@ -447,6 +430,12 @@ def discovery_potential(
             # print null, alternate, -2*(allh.llh(**null)-allh.llh(**alternate))-critical_ts
             return -2 * (allh.llh(**null) - allh.llh(**alternate))
 
+    def ts(flux_norm):
+        """
+        Test statistic of flux_norm against flux norm=0
+        """
+        return _ts(float(np.squeeze(flux_norm)))
+
     def f(flux_norm):
         return ts(flux_norm) - critical_ts
 
@@ -484,32 +473,30 @@ def events_above(observables, edges, ecutoff):
         # print(np.shape(observables[k]))
         if len(edge_k) > 2:
             edge_k = [edge_k[1], edge_k[2]]
-        cut = np.where(edge_k[1][1:] > ecutoff)[0][0]
-        n += observables[k].sum(axis=0)[cut:].sum()
+        # index of the first bin whose upper edge is above the cutoff
+        cut = np.searchsorted(edge_k[1][1:], ecutoff, side="right")
+        n += observables[k][:, cut:].sum()
 
     return n
 
 
 def fc_upper_limit(point_source, diffuse_components, ecutoff=0, cl=0.9, **fixed):
+    if cl != 0.9:
+        raise ValueError("I can only handle 90% CL")
+
     components = dict(ps=point_source)
     components.update(diffuse_components)
 
     llh = asimov_llh(components, ps=1, **fixed)
 
     exes = get_expectations(llh, ps=1, **fixed)
-    ntot = sum(
-        [
-            events_above(exes[k], components[k].bin_edges, ecutoff)
-            for k in list(exes.keys())
-        ]
-    )
-    ns = events_above(exes["ps"], components["ps"].bin_edges, ecutoff)
+    nevents = {k: events_above(exes[k], components[k].bin_edges, ecutoff) for k in exes}
+    ntot = sum(nevents.values())
+    ns = nevents["ps"]
     nb = ntot - ns
 
     logging.getLogger().info("ns: %.2g, nb: %.2g" % (ns, nb))
 
-    if cl != 0.9:
-        raise ValueError("I can only handle 90% CL")
     try:
         return fc_upper_limit.table(nb) / ns
     except ValueError:
@@ -549,18 +536,26 @@ def upper_limit(
     components = dict(ps=point_source)
     components.update(diffuse_components)
 
+    # the Asimov dataset and the null hypothesis do not depend on flux_norm,
+    # so they only need to be evaluated once
+    null_llh = asimov_llh(components, ps=0, **fixed)
+    if len(fixed) == len(diffuse_components):
+        null = null_llh.llh(ps=0, **fixed)
+    else:
+        null = null_llh.llh(**null_llh.fit(ps=0, **fixed))
+
+    @lru_cache(maxsize=None)
+    def _ts(flux_norm):
+        if len(fixed) == len(diffuse_components):
+            return -2 * (null - null_llh.llh(ps=flux_norm, **fixed))
+        else:
+            return -2 * (null - null_llh.llh(**null_llh.fit(ps=flux_norm, **fixed)))
+
     def ts(flux_norm):
         """
         Test statistic of flux_norm against flux norm=0
         """
-        allh = asimov_llh(components, ps=0, **fixed)
-        if len(fixed) == len(diffuse_components):
-            return -2 * (allh.llh(ps=0, **fixed) - allh.llh(ps=flux_norm, **fixed))
-        else:
-            return -2 * (
-                allh.llh(**allh.fit(ps=0, **fixed))
-                - allh.llh(**allh.fit(ps=flux_norm, **fixed))
-            )
+        return _ts(float(np.squeeze(flux_norm)))
 
     def f(flux_norm):
         # NB: minus sign, because now the null hypothesis is no source
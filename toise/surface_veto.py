@@ -1,6 +1,8 @@
 import os
 import pickle
+import tempfile
 from copy import copy
+from functools import lru_cache
 
 import healpy
 import numpy as np
@@ -72,7 +74,22 @@ def margin_for_area(base_surface, area):
     def area_diff(margin):
         return base_surface.expand(margin).get_cap_area() / 1e6 - area
 
-    return fsolve(area_diff, 0)[0]
+    # Expanding an upright surface by a margin m moves each edge of its
+    # footprint outward, so the cap area is quadratic in m,
+    # A(m) = A0 + b*m + c*m^2. Determine the coefficients from 3 evaluations
+    # (with steps large enough to resolve the curvature) and solve for m
+    # directly.
+    h = 100.0
+    a0, a1, a2 = (area_diff(m) for m in (0.0, h, 2 * h))
+    b = (4 * a1 - a2 - 3 * a0) / (2 * h)
+    c = (a2 - 2 * a1 + a0) / (2 * h**2)
+    # root closest to 0, in a form that is also stable for c -> 0
+    margin = -2 * a0 / (b + np.sqrt(b**2 - 4 * c * a0))
+    if np.isfinite(margin) and abs(area_diff(margin)) <= 1e-9 * max(area, 1):
+        return margin
+    else:
+        # the footprint did not grow quadratically; fall back to a root finder
+        return fsolve(area_diff, 0)[0]
 
 
 def get_geometric_coverage_for_area(
@@ -101,17 +118,32 @@ def get_geometric_coverage_for_area(
         # upgoing events can never be vetoed, no matter what
         if ct_hi < 0:
             continue
-        inside = 0
         dirs, pos = ref_surface.sample_impact_ray(ct_lo, ct_hi, nsamples)
         # project up the to the surface
         pos += ((1950 - pos[:, -1:]) / dirs[:, -1:]) * dirs
         # catch stupid sign errors
         assert (abs(pos[:, -1] - 1950) < 1).all()
         # did the shower cross the surface array?
-        coverage[i] = sum(map(veto_surface.point_in_footprint, pos)) / float(nsamples)
+        coverage[i] = veto_surface.point_in_footprint(pos).sum() / nsamples
     return coverage
 
 
+@lru_cache(maxsize=None)
+def _load_coverage_cache(cache_file):
+    """
+    Load the coverage cache from disk once per process. The returned dict is
+    shared by all GeometricVetoCoverage instances using the same file.
+    """
+    if os.path.exists(cache_file):
+        with open(cache_file, "rb") as f:
+            cache = pickle.load(f)
+        for coverage in cache.values():
+            coverage.setflags(write=False)
+        return cache
+    else:
+        return dict()
+
+
 class GeometricVetoCoverage(object):
     cache_file = os.path.join(data_dir, "veto", "geometric_veto_coverage.pickle")
 
@@ -119,11 +151,7 @@ class GeometricVetoCoverage(object):
         self.geometry = geometry
         self.spacing = spacing
         self.area = area
-        if os.path.exists(self.cache_file):
-            with open(self.cache_file, "rb") as f:
-                self.cache = pickle.load(f)
-        else:
-            self.cache = dict()
+        self.cache = _load_coverage_cache(self.cache_file)
 
     def __call__(self, ct_bins=np.linspace(-1, 1, 11)):
         key = (
@@ -138,17 +166,42 @@ class GeometricVetoCoverage(object):
             coverage = get_geometric_coverage_for_area(
                 self.geometry, self.spacing, self.area, ct_bins, 100000
             )
+            # shared between instances; make sure nobody modifies it
+            coverage.setflags(write=False)
             self.cache[key] = coverage
             if not os.path.isdir(os.path.dirname(self.cache_file)):
                 os.makedirs(os.path.dirname(self.cache_file))
-            with open(self.cache_file, "wb") as f:
-                pickle.dump(self.cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # write to a temporary file and move it into place, so that an
+            # interrupted write can't leave a truncated cache behind. the
+            # temporary file is unique to this writer, so concurrent fills
+            # can't move each other's half-written files into place.
+            fd, tmp = tempfile.mkstemp(
+                dir=os.path.dirname(self.cache_file), suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(self.cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+                # mkstemp creates the file 0600; give the shared cache the
+                # permissions a plain open() would have
+                umask = os.umask(0)
+                os.umask(umask)
+                os.chmod(tmp, 0o666 & ~umask)
+                os.replace(tmp, self.cache_file)
+            except BaseException:
+                os.unlink(tmp)
+                raise
             return coverage
 
 
+@lru_cache(maxsize=32)
+def _load_veto_efficiencies(fname):
+    with open(fname, "rb") as f:
+        return pickle.load(f)
+
+
 class EulerVetoProbability(object):
     def __init__(self, fname=os.path.join(data_dir, "veto", "vetoeffs.pickle")):
-        vetoeffs = pickle.load(open(fname))
+        vetoeffs = _load_veto_efficiencies(fname)
         x, y, v_mu, v_e = (
             vetoeffs["logE"],
             vetoeffs["cosZen"],
@@ -169,10 +222,14 @@ class EulerVetoProbability(object):
         logE, cos_theta = np.broadcast_arrays(
             np.log10(energy / 1e3), np.clip(cos_theta, -1, self.ct_max)
         )
-        p = np.clip(self.spline(logE, cos_theta, grid=False), 0, self.pmax)
-        p[logE > self.log_emax] = self.pmax
-        p[logE < self.log_emin] = 0
-        p[cos_theta < self.ct_min] = 0
+        in_ct = cos_theta >= self.ct_min
+        p = np.zeros(logE.shape)
+        p[in_ct & (logE > self.log_emax)] = self.pmax
+        # evaluate the spline only within the bounds of the table
+        live = in_ct & (logE >= self.log_emin) & (logE <= self.log_emax)
+        p[live] = np.clip(
+            self.spline(logE[live], cos_theta[live], grid=False), 0, self.pmax
+        )
         return p
 
 
@@ -274,9 +331,7 @@ def gaisser_flux(energy, ptype):
     else:
         z = ptype % 100
 
-    codes = sorted(
-        [v for v in list(ParticleType.__dict__.values()) if isinstance(v, int)]
-    )
+    codes = sorted([v for v in ParticleType.__dict__.values() if isinstance(v, int)])
     idx = codes.index(ptype)
 
     # normalizations for each element
@@ -364,7 +419,7 @@ def bundle_flux_at_depth(emu, cos_theta):
         H/He/CNO/MgAlSi/Fe
     """
     # make everything an array
-    emu, cos_theta = list(map(np.asarray, (emu, cos_theta)))
+    emu, cos_theta = map(np.asarray, (emu, cos_theta))
     emu_center = 10 ** (center(np.log10(emu)))
     shape = np.broadcast(emu_center, cos_theta).shape
     # primary spectrum for each element
@@ -265,25 +265,26 @@ class UprightSurface(object):
         :returns: a product of area and solid angle. Divide by
                   2*pi*(cosMax-cosMin) to obtain the average projected area in
                   this zenith angle range
+
+        *cosMin* and *cosMax* may also be arrays, in which case the etendue
+        is calculated for each pair of limits.
         """
 
         sides = self.get_side_area()
         cap = self.get_cap_area()
 
-        if cosMin >= 0 and cosMax >= 0:
-            area = self._integrate_area(cosMin, cosMax, cap, sides)
-        elif cosMin < 0 and cosMax <= 0:
-            area = self._integrate_area(-cosMax, -cosMin, cap, sides)
-        elif cosMin < 0 and cosMax > 0:
-            area = self._integrate_area(0, -cosMin, cap, sides) + self._integrate_area(
-                0, cosMax, cap, sides
-            )
-        else:
-            area = np.nan
+        lo, hi = np.broadcast_arrays(cosMin, cosMax)
+        invalid = (lo >= 0) & (hi < 0)
+        if invalid.any():
             raise ValueError(
-                "Can't deal with zenith range [%.1e, %.1e]" % (cosMin, cosMax)
+                "Can't deal with zenith range [%.1e, %.1e]"
+                % (lo[invalid][0], hi[invalid][0])
             )
-        return 2 * np.pi * area
+        # the projected area depends only on |cos(zenith)|, so integrate
+        # outwards from the horizon to each limit
+        upper = np.sign(hi) * self._integrate_area(0, abs(hi), cap, sides)
+        lower = np.sign(lo) * self._integrate_area(0, abs(lo), cap, sides)
+        return 2 * np.pi * (upper - lower)
 
     def average_area(self, cosMin=-1, cosMax=1):
         """
@@ -293,6 +294,8 @@ class UprightSurface(object):
         :param cosMin: cosine of the maximum zenith angle
         :param cosMax: cosine of the minimum zenith angle
         :returns: the average projected area in the zenith angle range
+
+        Like :meth:`etendue`, this accepts arrays of limits.
         """
         return self.etendue(cosMin, cosMax) / (2 * np.pi * (cosMax - cosMin))
 
@@ -319,6 +322,10 @@ class ExtrudedPolygon(UprightSurface):
         self.length = z_range[1] - z_range[0]
 
         side_normals = hull_to_normals(hull)
+        # halfspace representation of the hull: a point p is inside if
+        # A.p + b <= 0 for every edge (A are the outward-facing edge normals)
+        self._hull_A = side_normals[:, :2]
+        self._hull_b = -(self._hull_A * hull).sum(axis=1)
         self._side_lengths = hull_to_lengths(hull)
         side_areas = self._side_lengths * self.length
         cap_area = [signed_area(hull)] * 2
@@ -356,7 +363,7 @@ class ExtrudedPolygon(UprightSurface):
         positions = np.empty((len(directions), 3))
         while accepted < size:
             cpos = np.random.uniform(size=(blocksize, 2)) * scale + offset
-            mask = np.array(list(map(self._point_in_hull, cpos)))
+            mask = self._point_in_hull(cpos)
             cpos = cpos[mask]
             if len(cpos) + accepted > size:
                 cpos = cpos[: size - accepted]
@@ -386,7 +393,8 @@ class ExtrudedPolygon(UprightSurface):
             prob = areas.cumsum(axis=1)
             prob /= prob[:, -1:]
             p = np.random.uniform(size=block)
-            target = np.array([prob[i, :].searchsorted(p[i]) for i in range(block)])
+            # index of the first element of each row of prob that is >= p
+            target = (prob < p[:, None]).sum(axis=1)
 
             # first, handle sides
             sides = target < len(self._areas) - 2
@@ -517,19 +525,13 @@ class ExtrudedPolygon(UprightSurface):
 
     def _point_in_hull(self, point):
         """
-        Test whether point is inside the 2D hull by ray casting
-        """
-        x, y = point[0:2]
-        # Find segments whose y range spans the current point
-        mask = ((self._x[:, 1] > y) & (self._nx[:, 1] <= y)) | (
-            (self._x[:, 1] <= y) & (self._nx[:, 1] > y)
-        )
-        # Count crossings to the right of the current point
-        xc = self._x[:, 0] + (y - self._x[:, 1]) * self._dx[:, 0] / self._dx[:, 1]
-        crossings = (x < xc[mask]).sum()
-        inside = (crossings % 2) == 1
+        Test whether point is inside the 2D hull
 
-        return inside
+        :param point: a single point, or an array of points with coordinates
+            along the last axis
+        """
+        point = np.asarray(point)
+        return (np.dot(point[..., :2], self._hull_A.T) + self._hull_b <= 0).all(axis=-1)
 
     def _distance_to_hull(self, point, vec):
         """
@@ -606,7 +608,8 @@ class Cylinder(UprightSurface):
         return Cylinder(self.length + 2 * margin, self.radius + margin)
 
     def point_in_footprint(self, point):
-        return np.hypot(point[0], point[1]) < self.radius
+        point = np.asarray(point)
+        return np.hypot(point[..., 0], point[..., 1]) < self.radius
 
     def get_z_range(self):
         return (-self.length / 2.0, self.length / 2)
@@ -649,7 +652,8 @@ class Cylinder(UprightSurface):
             prob = areas.cumsum(axis=1)
             prob /= prob[:, -1:]
             p = np.random.uniform(size=block)
-            target = np.array([prob[i, :].searchsorted(p[i]) for i in range(block)])
+            # index of the first element of each row of prob that is >= p
+            target = (prob < p[:, None]).sum(axis=1)
 
             # first, handle sides
             sides = target == 0